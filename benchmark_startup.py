@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+启动性能基准测试
+分别统计各组件的导入时间和构造时间，以及从启动到第一条语句执行完成的时间
+用法: python benchmark_startup.py [重复次数]
+"""
+
+import os
+import sys
+import subprocess
+from typing import List, Optional
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 添加当前目录到Python路径
+sys.path.insert(0, PROJECT_DIR)
+
+# (显示名称, 模块名)
+IMPORT_TARGETS = [
+    ('SQLCompilerV3', 'compiler.sql_compiler_v3'),
+    ('ExecutionEngineV3', 'engine.execution_engine_v3'),
+    ('StorageAdapter', 'storage.storage_adapter'),
+    ('AuthManager', 'auth.auth_manager'),
+    ('PermissionManager', 'auth.permission_manager'),
+    ('DatabaseSystemV3', 'main_v3'),
+]
+
+# 每个样本在新的解释器和新的数据目录中运行，setup不计时，check在计时结束后校验结果
+_TIMED_SNIPPET = """
+import shutil, sys, tempfile, time
+sys.path.insert(0, {path!r})
+data_dir = tempfile.mkdtemp(prefix='startup_bench_')
+try:
+{setup}
+    start = time.perf_counter()
+{action}
+    elapsed = time.perf_counter() - start
+{check}
+    print(elapsed)
+finally:
+    shutil.rmtree(data_dir, ignore_errors=True)
+"""
+
+# (显示名称, 准备代码, 计时代码)
+CONSTRUCTION_TARGETS = [
+    ('SQLCompilerV3', "from compiler.sql_compiler_v3 import SQLCompilerV3",
+     "SQLCompilerV3()"),
+    ('ExecutionEngineV3', "from engine.execution_engine_v3 import ExecutionEngineV3",
+     "ExecutionEngineV3(data_dir)"),
+    ('StorageAdapter', "from storage.storage_adapter import StorageAdapter",
+     "StorageAdapter(data_dir)"),
+    ('AuthManager', "from storage.storage_adapter import StorageAdapter\n"
+                    "from auth.auth_manager import AuthManager\n"
+                    "storage_adapter = StorageAdapter(data_dir)",
+     "AuthManager(storage_adapter)"),
+    ('PermissionManager', "from storage.storage_adapter import StorageAdapter\n"
+                          "from auth.auth_manager import AuthManager\n"
+                          "from auth.permission_manager import PermissionManager\n"
+                          "storage_adapter = StorageAdapter(data_dir)\n"
+                          "auth_manager = AuthManager(storage_adapter)",
+     "PermissionManager(storage_adapter, auth_manager)"),
+    ('DatabaseSystemV3', "from main_v3 import DatabaseSystemV3",
+     "DatabaseSystemV3(data_dir)"),
+]
+
+# 延迟构造的编译器和执行引擎在第一条语句时才创建
+FIRST_STATEMENT = (
+    "from main_v3 import DatabaseSystemV3",
+    "db = DatabaseSystemV3(data_dir)\n"
+    "db.login('admin', 'admin123')\n"
+    "result = db.execute_sql('CREATE TABLE startup_bench (id INT);')",
+    "assert result['success'], result"
+)
+
+
+def _indent(code: str) -> str:
+    """把代码缩进到try块中"""
+    return '\n'.join('    ' + line for line in code.splitlines()) or '    pass'
+
+
+def measure_in_subprocess(setup: str, action: str, check: str = '') -> Optional[float]:
+    """在新的解释器中测量action的耗时（秒），执行失败返回None"""
+    code = _TIMED_SNIPPET.format(path=PROJECT_DIR, setup=_indent(setup),
+                                 action=_indent(action), check=_indent(check))
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_import(module: str) -> Optional[float]:
+    """在新的解释器中测量模块的冷导入时间（秒），导入失败返回None"""
+    return measure_in_subprocess('', f"import {module}")
+
+
+def _median(values: List[float]) -> float:
+    """中位数"""
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def _report(name: str, samples: List[Optional[float]], failure: str):
+    """输出中位数，有样本失败时输出失败信息"""
+    if any(sample is None for sample in samples):
+        print(f"{name:<20} {failure}")
+    else:
+        print(f"{name:<20} {_median(samples) * 1000:>10.2f} ms")
+
+
+def benchmark_imports(repeat: int):
+    """导入时间"""
+    print("\n1. 导入时间（新解释器，冷导入）")
+    print("-" * 60)
+    for name, module in IMPORT_TARGETS:
+        _report(name, [measure_import(module) for _ in range(repeat)], "导入失败")
+
+
+def benchmark_construction(repeat: int):
+    """构造时间"""
+    print("\n2. 构造时间（新解释器，模块已导入，不含导入时间）")
+    print("-" * 60)
+    for name, setup, action in CONSTRUCTION_TARGETS:
+        _report(name, [measure_in_subprocess(setup, action) for _ in range(repeat)], "构造失败")
+
+    samples = [measure_in_subprocess(*FIRST_STATEMENT) for _ in range(repeat)]
+    _report('首条语句（含构造）', samples, "执行失败")
+
+
+def main():
+    """主函数"""
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("=" * 60)
+    print(f"启动性能基准测试（每项取 {repeat} 次的中位数）")
+    print("=" * 60)
+
+    benchmark_imports(repeat)
+    benchmark_construction(repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+COPY批量导入导出
+支持 COPY table FROM 'file' (FORMAT csv|jsonl) 和 COPY table TO 'file' (FORMAT csv|jsonl)，
+导入时逐行读取文件并按系统目录中的表结构校验、转换类型
+"""
+
+import json
+import re
+from typing import Dict, Any, Optional, List, Tuple, Iterator, TextIO
+
+# COPY table FROM|TO 'file' [(FORMAT csv|jsonl)]
+_COPY_RE = re.compile(
+    r"^\s*COPY\s+(?P<table>[^\W\d]\w*)\s+(?P<direction>FROM|TO)\s+'(?P<path>(?:[^']|'')*)'"
+    r"\s*(?:\(\s*FORMAT\s+(?P<format>CSV|JSONL)\s*\)|FORMAT\s+(?P<bare_format>CSV|JSONL))?\s*;?\s*$",
+    re.IGNORECASE
+)
+
+_INT_TYPES = ('int', 'integer', 'bigint', 'smallint')
+_FLOAT_TYPES = ('float', 'double', 'real', 'decimal', 'numeric')
+_BOOL_TYPES = ('bool', 'boolean')
+_TRUE_VALUES = ('true', 't', 'yes', '1')
+_FALSE_VALUES = ('false', 'f', 'no', '0')
+
+
+def parse_copy(sql: str) -> Optional[Dict[str, Any]]:
+    """解析COPY语句，不是COPY语句时返回None；未指定格式时按文件扩展名判断"""
+    match = _COPY_RE.match(sql)
+    if not match:
+        return None
+
+    path = match.group('path').replace("''", "'")
+    file_format = match.group('format') or match.group('bare_format')
+    if file_format is None:
+        file_format = 'jsonl' if path.lower().endswith(('.jsonl', '.json')) else 'csv'
+
+    return {
+        'table_name': match.group('table'),
+        'direction': match.group('direction').upper(),
+        'path': path,
+        'format': file_format.lower()
+    }
+
+
+def schema_columns(schema: Any) -> List[Tuple[str, str, Optional[int]]]:
+    """从表结构中提取 [(列名, 类型名, 长度)]，按列定义顺序"""
+    columns = schema.get('columns') if isinstance(schema, dict) else schema
+    if isinstance(columns, dict):
+        items = list(columns.items())
+    elif isinstance(columns, list):
+        items = [(column['name'], column) for column in columns]
+    else:
+        raise ValueError("无法识别的表结构")
+
+    result = []
+    for name, info in items:
+        column_type = info.get('type', info) if isinstance(info, dict) else info
+        if isinstance(column_type, dict):
+            type_name, length = column_type.get('type'), column_type.get('length')
+        else:
+            type_name, length = column_type, None
+        result.append((name, str(type_name).lower(), length))
+    return result
+
+
+def convert_value(value: Any, column: Tuple[str, str, Optional[int]]) -> Any:
+    """按列类型转换并校验一个值，None为NULL，空字符串按原样保留"""
+    name, type_name, length = column
+    if value is None:
+        return None
+
+    try:
+        if type_name in _INT_TYPES:
+            if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                raise ValueError
+            return int(value)
+        if type_name in _FLOAT_TYPES:
+            if isinstance(value, bool):
+                raise ValueError
+            return float(value)
+        if type_name in _BOOL_TYPES:
+            if isinstance(value, bool):
+                return value
+            text = str(value).strip().lower()
+            if text in _TRUE_VALUES:
+                return True
+            if text in _FALSE_VALUES:
+                return False
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError(f"列 '{name}' 的值 {value!r} 不是 {type_name.upper()} 类型")
+
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"列 '{name}' 的值 {value!r} 不是 {type_name.upper()} 类型")
+    text = value if isinstance(value, str) else str(value)
+    if length and len(text) > length:
+        raise ValueError(f"列 '{name}' 的值长度 {len(text)} 超过 {type_name.upper()}({length})")
+    return text
+
+
+def _csv_records(f: TextIO) -> Iterator[Tuple[int, List[Optional[str]]]]:
+    """逐条读取CSV记录，产出 (起始行号, 字段列表)
+
+    与PostgreSQL的CSV格式一致：未加引号的空字段为NULL（None），加引号的 "" 为空字符串；
+    引号内的字段可以跨行，空行被跳过
+    """
+    line_no = 0
+    for line in f:
+        line_no += 1
+        start = line_no
+        fields = []
+        chars = []
+        quoted = in_quotes = False
+        i = 0
+        while True:
+            if i >= len(line):
+                if not in_quotes:
+                    break
+                # 引号内的换行属于字段内容，继续读取下一行
+                line = next(f, None)
+                if line is None:
+                    raise ValueError(f"第 {start} 行: 引号未闭合")
+                line_no += 1
+                i = 0
+                continue
+            char = line[i]
+            i += 1
+            if in_quotes:
+                if char != '"':
+                    chars.append(char)
+                elif line[i:i + 1] == '"':
+                    chars.append('"')
+                    i += 1
+                else:
+                    in_quotes = False
+            elif char == '"' and not chars and not quoted:
+                in_quotes = quoted = True
+            elif char == ',':
+                fields.append(''.join(chars) if chars or quoted else None)
+                chars = []
+                quoted = False
+            elif char not in '\r\n':
+                chars.append(char)
+        fields.append(''.join(chars) if chars or quoted else None)
+        if fields != [None]:
+            yield start, fields
+
+
+def _csv_field(value: Any) -> str:
+    """把一个值写成CSV字段：NULL为空字段，空字符串和含特殊字符的值加引号"""
+    if value is None:
+        return ''
+    text = value if isinstance(value, str) else str(value)
+    if text == '' or any(char in text for char in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def read_rows(path: str, file_format: str,
+              columns: List[Tuple[str, str, Optional[int]]]) -> Tuple[List[str], Iterator[Tuple[int, List[Any]]]]:
+    """打开数据文件，返回导入的列名和逐行产出 (行号, 已转换的值) 的迭代器
+
+    CSV文件第一行为列名；JSONL文件每行一个对象，缺少的列为NULL
+    """
+    column_map = {column[0]: column for column in columns}
+
+    if file_format == 'csv':
+        f = open(path, 'r', encoding='utf-8', newline='')
+        records = _csv_records(f)
+        try:
+            first = next(records, None)
+        except ValueError:
+            f.close()
+            raise
+        if first is None:
+            f.close()
+            return [], iter(())
+        header = [(name or '').strip() for name in first[1]]
+        unknown = [name for name in header if name not in column_map]
+        if unknown:
+            f.close()
+            raise ValueError(f"列不存在: {', '.join(unknown)}")
+
+        def csv_rows():
+            with f:
+                for line_no, record in records:
+                    if len(record) != len(header):
+                        raise ValueError(f"第 {line_no} 行: 需要 {len(header)} 个字段，实际 {len(record)} 个")
+                    try:
+                        yield line_no, [convert_value(value, column_map[name])
+                                        for name, value in zip(header, record)]
+                    except ValueError as e:
+                        raise ValueError(f"第 {line_no} 行: {e}")
+
+        return header, csv_rows()
+
+    if file_format == 'jsonl':
+        names = [column[0] for column in columns]
+        f = open(path, 'r', encoding='utf-8')
+
+        def jsonl_rows():
+            with f:
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        if not isinstance(record, dict):
+                            raise ValueError("每行必须是JSON对象")
+                        unknown = [name for name in record if name not in column_map]
+                        if unknown:
+                            raise ValueError(f"列不存在: {', '.join(unknown)}")
+                        yield line_no, [convert_value(record.get(column[0]), column) for column in columns]
+                    except ValueError as e:
+                        raise ValueError(f"第 {line_no} 行: {e}")
+
+        return names, jsonl_rows()
+
+    raise ValueError(f"不支持的文件格式: {file_format}")
+
+
+def write_rows(path: str, file_format: str, columns: List[str], rows: List[Dict[str, Any]]) -> int:
+    """把查询结果写入文件，返回写入的行数"""
+    if file_format == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(','.join(_csv_field(name) for name in columns) + '\n')
+            for row in rows:
+                f.write(','.join(_csv_field(row.get(name)) for name in columns) + '\n')
+    elif file_format == 'jsonl':
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps({name: row.get(name) for name in columns}, ensure_ascii=False))
+                f.write('\n')
+    else:
+        raise ValueError(f"不支持的文件格式: {file_format}")
+    return len(rows)
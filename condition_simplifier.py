@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+WHERE条件化简
+在执行计划交给执行引擎之前改写 where_clause：折叠只含数字字面量的子表达式，
+去掉AND链中恒真的比较，发现恒假条件时不扫描直接返回空结果，合并同一列上的范围条件
+"""
+
+from typing import Dict, Any, Optional, List, Tuple, Union
+
+_COMPARISONS = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<>': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+# 交换比较两侧时的运算符
+_FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '=': '='}
+
+# 只有这些计划类型的where_clause会被改写
+_FILTERED_PLANS = ('SELECT', 'UPDATE', 'DELETE')
+
+# 恒假时不能直接返回空结果的SELECT（聚合在没有输入行时仍输出一行）
+_GROUP_KEYS = ('group_by', 'group_by_clause', 'having', 'having_clause', 'aggregates')
+
+Condition = Union[Dict[str, Any], bool]
+
+
+def _operator(node: Dict[str, Any]) -> str:
+    """获取节点的运算符（大写）"""
+    operator = node.get('operator')
+    return operator.upper() if isinstance(operator, str) else ''
+
+
+def _is_number(node: Any) -> bool:
+    """检查节点是否为数字字面量"""
+    return (isinstance(node, dict) and str(node.get('type', '')).upper() == 'NUMBER'
+            and isinstance(node.get('value'), (int, float)) and not isinstance(node.get('value'), bool))
+
+
+def _is_column(node: Any) -> bool:
+    """检查节点是否为列引用"""
+    return isinstance(node, dict) and str(node.get('type', '')).upper() == 'COLUMN' and 'name' in node
+
+
+def _is_logical(node: Any, operator: str) -> bool:
+    """检查节点是否为指定的二元逻辑运算（AND/OR）"""
+    return isinstance(node, dict) and 'left' in node and 'right' in node and (
+        _operator(node) == operator or str(node.get('type', '')).upper() == operator)
+
+
+def _fold_arithmetic(node: Dict[str, Any], left: Any, right: Any) -> Optional[Dict[str, Any]]:
+    """折叠两个数字字面量之间的算术运算，不能安全折叠时返回None"""
+    a, b = left['value'], right['value']
+    operator = node.get('operator')
+    if operator == '+':
+        value = a + b
+    elif operator == '-':
+        value = a - b
+    elif operator == '*':
+        value = a * b
+    elif operator == '/' and isinstance(a, int) and isinstance(b, int) and b != 0 and a % b == 0:
+        # 只折叠整除的整数除法，整数除法和浮点除法在这种情况下结果相同
+        value = a // b
+    else:
+        return None
+    return dict(left, value=value)
+
+
+def _simplify_expression(node: Any) -> Any:
+    """折叠表达式中只含数字字面量的子树，不修改原节点"""
+    if not isinstance(node, dict) or 'left' not in node or 'right' not in node:
+        return node
+    left = _simplify_expression(node['left'])
+    right = _simplify_expression(node['right'])
+    if _is_number(left) and _is_number(right) and node.get('operator') in ('+', '-', '*', '/'):
+        folded = _fold_arithmetic(node, left, right)
+        if folded is not None:
+            return folded
+    if left is node['left'] and right is node['right']:
+        return node
+    return dict(node, left=left, right=right)
+
+
+def _simplify_comparison(node: Dict[str, Any]) -> Condition:
+    """化简比较，两侧都是数字字面量时求值"""
+    left = _simplify_expression(node['left'])
+    right = _simplify_expression(node['right'])
+    compare = _COMPARISONS.get(node.get('operator'))
+    if compare is not None and _is_number(left) and _is_number(right):
+        return compare(left['value'], right['value'])
+    if left is node['left'] and right is node['right']:
+        return node
+    return dict(node, left=left, right=right)
+
+
+def _flatten(node: Dict[str, Any], operator: str, terms: List[Dict[str, Any]]):
+    """展开同一种逻辑运算的链"""
+    for child in (node['left'], node['right']):
+        if _is_logical(child, operator):
+            _flatten(child, operator, terms)
+        else:
+            terms.append(child)
+
+
+def _rebuild(template: Dict[str, Any], terms: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """按原逻辑节点的形状把条件重新连成左深链"""
+    node = terms[0]
+    for term in terms[1:]:
+        node = dict(template, left=node, right=term)
+    return node
+
+
+def _column_key(node: Dict[str, Any]) -> Optional[Tuple]:
+    """用列节点的全部内容（含表名限定）作为分组键，无法作为键时返回None"""
+    key = tuple(sorted(node.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _range_bound(term: Any) -> Optional[Tuple[Tuple, str, Union[int, float]]]:
+    """把 列 运算符 数字 形式的比较转换为 (列键, 运算符, 值)，数字在左侧时交换两侧"""
+    if not isinstance(term, dict) or term.get('operator') not in _FLIPPED or 'left' not in term:
+        return None
+    left, right = term['left'], term.get('right')
+    if _is_column(left) and _is_number(right):
+        column, operator, value = left, term['operator'], right['value']
+    elif _is_number(left) and _is_column(right):
+        column, operator, value = right, _FLIPPED[term['operator']], left['value']
+    else:
+        return None
+    key = _column_key(column)
+    return None if key is None else (key, operator, value)
+
+
+def _merge_ranges(terms: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """合并AND链中同一列上的范围条件，只保留最紧的上下界；范围为空时返回None"""
+    groups: Dict[Tuple, List[Tuple[int, str, Union[int, float]]]] = {}
+    for index, term in enumerate(terms):
+        bound = _range_bound(term)
+        if bound is not None:
+            column, operator, value = bound
+            groups.setdefault(column, []).append((index, operator, value))
+
+    dropped = set()
+    for bounds in groups.values():
+        if len(bounds) < 2:
+            continue
+
+        equal = lower = upper = None
+        for index, operator, value in bounds:
+            if operator == '=':
+                if equal is not None and equal[2] != value:
+                    return None
+                equal = equal or (index, operator, value)
+            elif operator in ('>', '>='):
+                if lower is None or value > lower[2] or (value == lower[2] and operator == '>'):
+                    lower = (index, operator, value)
+            elif upper is None or value < upper[2] or (value == upper[2] and operator == '<'):
+                upper = (index, operator, value)
+
+        if equal is not None:
+            value = equal[2]
+            if any(item is not None and not _COMPARISONS[item[1]](value, item[2]) for item in (lower, upper)):
+                return None
+            kept = {equal[0]}
+        else:
+            if lower is not None and upper is not None:
+                if lower[2] > upper[2] or (lower[2] == upper[2] and (lower[1] == '>' or upper[1] == '<')):
+                    return None
+            kept = {item[0] for item in (lower, upper) if item is not None}
+        dropped.update(index for index, _, _ in bounds if index not in kept)
+
+    return [term for index, term in enumerate(terms) if index not in dropped]
+
+
+def simplify_condition(node: Any, positive: bool = True) -> Condition:
+    """化简条件，返回新的条件节点，或True（恒真）/False（恒假）
+
+    positive表示条件不在NOT之下，此时NULL和假等价，才能合并范围和判定范围为空
+    """
+    if not isinstance(node, dict):
+        return node
+
+    if 'operand' in node and 'NOT' in (_operator(node), str(node.get('type', '')).upper()):
+        operand = simplify_condition(node['operand'], False)
+        if isinstance(operand, bool):
+            return not operand
+        return node if operand is node['operand'] else dict(node, operand=operand)
+
+    for operator in ('AND', 'OR'):
+        if _is_logical(node, operator):
+            flattened = []
+            _flatten(node, operator, flattened)
+            terms = []
+            for term in flattened:
+                term = simplify_condition(term, positive)
+                if term is (operator == 'OR'):
+                    # AND链中出现恒假或OR链中出现恒真，整条链的值已确定
+                    return term
+                if not isinstance(term, bool):
+                    terms.append(term)
+            if operator == 'AND' and positive:
+                terms = _merge_ranges(terms)
+                if terms is None:
+                    return False
+            if not terms:
+                return operator == 'AND'
+            if len(terms) == len(flattened) and all(a is b for a, b in zip(terms, flattened)):
+                return node
+            return _rebuild(node, terms)
+
+    if 'left' in node and 'right' in node and node.get('operator') in _COMPARISONS:
+        return _simplify_comparison(node)
+    return node
+
+
+def _returns_rows_without_input(plan: Dict[str, Any]) -> bool:
+    """没有输入行时SELECT是否仍可能输出行（聚合、分组）"""
+    if any(plan.get(key) for key in _GROUP_KEYS):
+        return True
+    columns = plan.get('columns')
+    if not isinstance(columns, list):
+        return False
+    return any(not (isinstance(column, str) and '(' not in column) and not _is_column(column)
+               for column in columns)
+
+
+def simplify_plan(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """化简执行计划的WHERE条件，返回 (新计划, 条件是否恒假)，不修改原计划
+
+    条件恒真时去掉where_clause；恒假但不能直接返回空结果时保留原计划
+    """
+    where_clause = plan.get('where_clause')
+    if plan.get('type') not in _FILTERED_PLANS or not isinstance(where_clause, dict):
+        return plan, False
+
+    condition = simplify_condition(where_clause)
+    if condition is False:
+        if plan['type'] == 'SELECT' and _returns_rows_without_input(plan):
+            return plan, False
+        return plan, True
+    if condition is where_clause:
+        return plan, False
+    return dict(plan, where_clause=None if condition is True else condition), False
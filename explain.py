@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+执行计划展示
+把SQLCompilerV3生成的执行计划转换为算子树（SeqScan、Filter、Aggregate、Sort、Project、Insert等），
+以文本或JSON格式输出，EXPLAIN ANALYZE时附带实际执行统计
+"""
+
+import json
+import re
+from typing import Dict, Any, Optional, List
+
+# EXPLAIN [ANALYZE] [FORMAT TEXT|JSON] <语句>
+_EXPLAIN_RE = re.compile(
+    r'^\s*EXPLAIN\s+(?:(?P<analyze>ANALYZE)\s+)?(?:FORMAT\s+(?P<format>TEXT|JSON)\s+)?(?P<sql>.+)$',
+    re.IGNORECASE | re.DOTALL
+)
+
+# 计划中分组、分组过滤、排序条件的键名
+_GROUP_KEYS = ('group_by', 'group_by_clause')
+_HAVING_KEYS = ('having', 'having_clause')
+_ORDER_KEYS = ('order_by', 'order_by_clause')
+
+# 算子树中已经体现的计划键，其余的键放在根节点的详情中
+_MODELED_KEYS = {'type', 'table_name', 'columns', 'where_clause', 'set_clause', 'assignments',
+                 'values', 'aggregates', 'limit'} | set(_GROUP_KEYS + _HAVING_KEYS + _ORDER_KEYS)
+
+_AGGREGATE_FUNCTIONS = ('COUNT', 'SUM', 'AVG', 'MIN', 'MAX')
+_AGGREGATE_RE = re.compile(r'^\s*(?:' + '|'.join(_AGGREGATE_FUNCTIONS) + r')\s*\(', re.IGNORECASE)
+
+
+def parse_explain(sql: str) -> Optional[Dict[str, Any]]:
+    """解析EXPLAIN前缀，不是EXPLAIN语句时返回None"""
+    match = _EXPLAIN_RE.match(sql)
+    if not match:
+        return None
+    return {
+        'analyze': match.group('analyze') is not None,
+        'format': (match.group('format') or 'TEXT').upper(),
+        'sql': match.group('sql')
+    }
+
+
+def _function_arguments(node: Dict[str, Any]) -> Any:
+    """获取函数调用节点的参数，不是函数调用时返回None"""
+    for key in ('args', 'arguments', 'argument'):
+        if key in node:
+            return node[key]
+    return None
+
+
+def _format_node(node: Dict[str, Any]) -> str:
+    """渲染表达式节点本身，不含别名和排序方向"""
+    if 'left' in node and 'right' in node:
+        return f"({format_expression(node['left'])} {node.get('operator', '?')} {format_expression(node['right'])})"
+    if 'operand' in node:
+        return f"{node.get('operator', '?')} {format_expression(node['operand'])}"
+
+    arguments = _function_arguments(node)
+    function = node.get('function') or (node.get('name') if arguments is not None else None)
+    if function:
+        rendered = '*' if arguments in (None, [], '*') else format_expression(arguments)
+        return f"{format_expression(function).upper()}({rendered})"
+
+    if str(node.get('type', '')).upper() == 'STRING' and isinstance(node.get('value'), str):
+        return "'" + node['value'].replace("'", "''") + "'"
+    for key in ('name', 'column', 'column_name', 'value'):
+        if key in node:
+            return format_expression(node[key])
+    return str(node)
+
+
+def format_expression(node: Any) -> str:
+    """把WHERE条件、表达式或表达式列表渲染为文本"""
+    if isinstance(node, dict):
+        text = _format_node(node)
+        if node.get('alias'):
+            text += f" AS {node['alias']}"
+        direction = node.get('direction') or node.get('order')
+        if isinstance(direction, str) and direction.upper() in ('ASC', 'DESC'):
+            text += f" {direction.upper()}"
+        return text
+    if isinstance(node, (list, tuple)):
+        return ', '.join(format_expression(item) for item in node)
+    if isinstance(node, str):
+        return node
+    return repr(node)
+
+
+def _plan_value(plan: Dict[str, Any], keys: tuple) -> Any:
+    """按候选键名获取计划中的值"""
+    for key in keys:
+        if plan.get(key):
+            return plan[key]
+    return None
+
+
+def _is_aggregate(column: Any) -> bool:
+    """检查选择列是否为聚合函数"""
+    if isinstance(column, str):
+        return _AGGREGATE_RE.match(column) is not None
+    if isinstance(column, dict):
+        if 'AGGREGATE' in str(column.get('type', '')).upper():
+            return True
+        function = column.get('function') or (column.get('name') if _function_arguments(column) is not None else None)
+        return isinstance(function, str) and function.upper() in _AGGREGATE_FUNCTIONS
+    return False
+
+
+def _format_assignments(assignments: Any) -> str:
+    """渲染UPDATE的赋值列表，支持 {列名: 值} 和 [{'column': 列, 'value': 值}] 两种形式"""
+    def value_text(value: Any) -> str:
+        if isinstance(value, str):
+            return "'" + value.replace("'", "''") + "'"
+        return format_expression(value)
+
+    if isinstance(assignments, dict) and 'type' not in assignments:
+        return ', '.join(f"{column} = {value_text(value)}" for column, value in assignments.items())
+    if isinstance(assignments, list):
+        return ', '.join(f"{format_expression(item['column'])} = {value_text(item['value'])}"
+                         if isinstance(item, dict) and 'column' in item and 'value' in item
+                         else format_expression(item) for item in assignments)
+    return format_expression(assignments)
+
+
+def _format_columns(columns: Any) -> str:
+    """渲染列列表"""
+    if not columns or columns == '*':
+        return '*'
+    if isinstance(columns, list):
+        return ', '.join(format_expression(column) for column in columns)
+    return format_expression(columns)
+
+
+def _node(operator: str, children: Optional[List[Dict[str, Any]]] = None, **details) -> Dict[str, Any]:
+    """创建算子节点"""
+    return {
+        'operator': operator,
+        'details': {key: value for key, value in details.items() if value is not None},
+        'children': children or []
+    }
+
+
+def build_operator_tree(plan: Dict[str, Any], always_false: bool = False) -> Dict[str, Any]:
+    """根据执行计划构建算子树，算子树没有体现的计划键放在根节点的详情中
+
+    always_false表示WHERE条件恒假，语句不扫描表，直接输出空结果
+    """
+    if always_false:
+        return _node('Result', one_time_filter='false', table=plan.get('table_name'))
+    tree = _build_tree(plan)
+    for key, value in plan.items():
+        if key not in _MODELED_KEYS and key not in tree['details'] and value not in (None, [], {}, ''):
+            tree['details'][key] = format_expression(value)
+    return tree
+
+
+def _build_tree(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """根据执行计划构建算子树"""
+    plan_type = plan.get('type')
+    table_name = plan.get('table_name')
+
+    def scan_with_filter() -> Dict[str, Any]:
+        scan = _node('SeqScan', table=table_name)
+        where_clause = plan.get('where_clause')
+        if where_clause:
+            return _node('Filter', [scan], condition=format_expression(where_clause))
+        return scan
+
+    if plan_type == 'SELECT':
+        node = scan_with_filter()
+
+        # 分组和聚合
+        columns = plan.get('columns')
+        group_by = _plan_value(plan, _GROUP_KEYS)
+        having = _plan_value(plan, _HAVING_KEYS)
+        aggregates = plan.get('aggregates') or [column for column in columns or [] if _is_aggregate(column)]
+        if group_by or having or aggregates:
+            node = _node('Aggregate', [node],
+                         group_key=format_expression(group_by) if group_by else None,
+                         aggregates=format_expression(aggregates) if aggregates else None,
+                         filter=format_expression(having) if having else None)
+
+        node = _node('Project', [node], columns=_format_columns(columns))
+
+        order_by = _plan_value(plan, _ORDER_KEYS)
+        if order_by:
+            node = _node('Sort', [node], sort_key=format_expression(order_by))
+        if plan.get('limit') is not None:
+            node = _node('Limit', [node], count=format_expression(plan['limit']))
+        return node
+    if plan_type == 'UPDATE':
+        assignments = plan.get('set_clause') or plan.get('assignments')
+        return _node('Update', [scan_with_filter()], table=table_name,
+                     set=_format_assignments(assignments) if assignments else None)
+    if plan_type == 'DELETE':
+        return _node('Delete', [scan_with_filter()], table=table_name)
+    if plan_type == 'INSERT':
+        values = plan.get('values')
+        rows = len(values) if isinstance(values, list) and values and isinstance(values[0], list) else None
+        columns = plan.get('columns')
+        return _node('Insert', table=table_name, columns=format_expression(columns) if columns else None, rows=rows)
+    if plan_type == 'CREATE_TABLE':
+        columns = plan.get('columns')
+        return _node('CreateTable', table=table_name, columns=format_expression(columns) if columns else None)
+    if plan_type == 'DROP_TABLE':
+        return _node('DropTable', table=table_name)
+    return _node(str(plan_type), table=table_name)
+
+
+def format_operator_tree(tree: Dict[str, Any]) -> str:
+    """以缩进文本输出算子树"""
+    lines = []
+
+    def visit(node: Dict[str, Any], depth: int):
+        details = ', '.join(f"{key}: {value}" for key, value in node['details'].items())
+        line = node['operator'] + (f" ({details})" if details else '')
+        actual = node.get('actual')
+        if actual:
+            line += (f" [实际: 时间={actual['time_ms']:.3f} ms, "
+                     f"输出行数={actual['rows_out']}]")
+        lines.append(('  ' * (depth - 1) + '  -> ' if depth else '') + line)
+        for child in node['children']:
+            visit(child, depth + 1)
+
+    visit(tree, 0)
+
+    actual = tree.get('actual') or {}
+    if actual.get('buffer'):
+        io_stats = ', '.join(f"{key} {value:+}" for key, value in actual['buffer'].items())
+        lines.append(f"缓冲区/页面I/O: {io_stats}")
+    return '\n'.join(lines)
+
+
+def format_explain(tree: Dict[str, Any], output_format: str) -> str:
+    """按指定格式输出算子树"""
+    if output_format == 'JSON':
+        return json.dumps(tree, ensure_ascii=False, indent=2, default=str)
+    return format_operator_tree(tree)
+
+
+def io_statistics_delta(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """计算两次缓存统计之间数值项的变化量"""
+    if not before or not after:
+        return {}
+    delta = {}
+    for key, value in after.items():
+        previous = before.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(previous, (int, float)):
+            if value != previous:
+                delta[key] = value - previous
+    return delta
@@ -6,32 +6,72 @@
 
 import sys
 import os
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Tuple, Iterable, Sequence, TextIO
 
 # 添加模块路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from .compiler.sql_compiler_v3 import SQLCompilerV3
-    from .engine.execution_engine_v3 import ExecutionEngineV3
     from .storage.storage_adapter import StorageAdapter
     from .auth.auth_manager import AuthManager
     from .auth.permission_manager import PermissionManager
+    from .plan_cache import (PlanCache, CachedPlan, SQLTemplate, parse_sql_template,
+                             stored_value_columns)
+    from .script_runner import iter_sql_statements
+    from .versioned_catalog import VersionedCatalog, DDL_PLAN_TYPES
+    from .explain import parse_explain, build_operator_tree, format_explain, io_statistics_delta
+    from .bulk_copy import parse_copy, schema_columns, read_rows, write_rows
+    from .condition_simplifier import simplify_plan
 except ImportError:
-    from compiler.sql_compiler_v3 import SQLCompilerV3
-    from engine.execution_engine_v3 import ExecutionEngineV3
     from storage.storage_adapter import StorageAdapter
     from auth.auth_manager import AuthManager
     from auth.permission_manager import PermissionManager
+    from plan_cache import (PlanCache, CachedPlan, SQLTemplate, parse_sql_template,
+                            stored_value_columns)
+    from script_runner import iter_sql_statements
+    from versioned_catalog import VersionedCatalog, DDL_PLAN_TYPES
+    from explain import parse_explain, build_operator_tree, format_explain, io_statistics_delta
+    from bulk_copy import parse_copy, schema_columns, read_rows, write_rows
+    from condition_simplifier import simplify_plan
+
+
+def _load_compiler_class():
+    """导入SQL编译器（包含PLY词法/语法分析表），推迟到第一次编译时"""
+    try:
+        from .compiler.sql_compiler_v3 import SQLCompilerV3
+    except ImportError:
+        from compiler.sql_compiler_v3 import SQLCompilerV3
+    return SQLCompilerV3
+
+
+def _load_engine_class():
+    """导入执行引擎，推迟到第一次执行时"""
+    try:
+        from .engine.execution_engine_v3 import ExecutionEngineV3
+    except ImportError:
+        from engine.execution_engine_v3 import ExecutionEngineV3
+    return ExecutionEngineV3
 
 class DatabaseSystemV3:
     """数据库系统 V3.0"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", plan_cache_size: int = 256):
         """初始化数据库系统"""
         self.data_dir = data_dir
-        self.compiler = SQLCompilerV3()
-        self.engine = ExecutionEngineV3(data_dir)
+        
+        # 编译器和执行引擎在第一次使用时创建，登录等操作不需要等待PLY分析表构建
+        self._compiler = None
+        self._engine = None
+        
+        # 编译器和执行引擎共享的目录版本，DDL执行后通知执行计划缓存
+        self.catalog = VersionedCatalog()
+        self.plan_cache = PlanCache(plan_cache_size)
+        self.catalog.subscribe(self.plan_cache.invalidate_table)
+        
+        # 预编译语句
+        self._prepared_statements: Dict[int, SQLTemplate] = {}
+        self._next_statement_handle = 1
         
         # 初始化存储适配器
         self.storage_adapter = StorageAdapter(data_dir)
@@ -42,19 +82,27 @@ class DatabaseSystemV3:
         
         # 确保数据目录存在
         os.makedirs(data_dir, exist_ok=True)
-        
-        # 同步编译器目录和执行引擎目录
-        self._sync_catalogs()
+    
+    @property
+    def compiler(self):
+        """SQL编译器，首次访问时创建并同步目录"""
+        if self._compiler is None:
+            self._compiler = _load_compiler_class()()
+            
+            # 同步编译器目录和执行引擎目录
+            self._sync_catalogs()
+        return self._compiler
+    
+    @property
+    def engine(self):
+        """执行引擎，首次访问时创建"""
+        if self._engine is None:
+            self._engine = _load_engine_class()(self.data_dir)
+        return self._engine
     
     def _sync_catalogs(self):
-        """同步编译器目录和执行引擎目录"""
-        engine_catalog = self.engine.get_catalog()
-        compiler_catalog = self.compiler.get_catalog()
-        
-        # 将执行引擎的目录同步到编译器
-        for table_name, table_info in engine_catalog.items():
-            if table_name not in compiler_catalog:
-                self.compiler.semantic_analyzer.catalog[table_name] = table_info['schema']
+        """将执行引擎的目录完整同步到编译器，只在创建编译器时执行一次"""
+        self.catalog.sync_all(self.engine.get_catalog(), self.compiler.semantic_analyzer.catalog)
     
     def login(self, username: str, password: str) -> bool:
         """用户登录"""
@@ -82,38 +130,213 @@ class DatabaseSystemV3:
                     'error': '用户未登录，请先登录'
                 }
             
+            # EXPLAIN [ANALYZE] 语句
+            explain = parse_explain(sql)
+            if explain is not None:
+                return self._explain(explain)
+            
+            # COPY 批量导入导出
+            copy_command = parse_copy(sql)
+            if copy_command is not None:
+                if copy_command['direction'] == 'FROM':
+                    return self._copy_from(copy_command)
+                return self._copy_to(copy_command)
+            
             # 编译SQL语句
-            compile_result = self.compiler.compile(sql)
+            compile_result = self._compile(sql)
+            
+            return self._execute_compiled(compile_result)
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"执行错误: {str(e)}"
+            }
+    
+    def _explain(self, explain: Dict[str, Any]) -> Dict[str, Any]:
+        """输出执行计划的算子树，ANALYZE时实际执行并附带耗时、行数和页面I/O统计"""
+        compile_result = self._compile(explain['sql'])
+        if not compile_result['success']:
+            return {
+                'success': False,
+                'error': f"编译错误: {'; '.join(compile_result['errors'])}"
+            }
+        
+        execution_plan = compile_result['execution_plan']
+        if not execution_plan:
+            return {
+                'success': False,
+                'error': "执行计划生成失败"
+            }
+        
+        if not explain['analyze'] and execution_plan['type'] in DDL_PLAN_TYPES:
+            # 编译DDL时编译器已修改自己的目录，不执行时按执行引擎的目录恢复该表
+            self.catalog.apply_ddl(execution_plan.get('table_name'), self.engine.get_catalog(),
+                                   self.compiler.semantic_analyzer.catalog)
+        
+        execution_plan, always_false = simplify_plan(execution_plan)
+        tree = build_operator_tree(execution_plan, always_false)
+        
+        if explain['analyze']:
+            io_before = self._io_statistics()
+            start_time = time.perf_counter()
+            result = self._execute_compiled(compile_result)
+            elapsed = time.perf_counter() - start_time
+            if not result['success']:
+                return result
             
-            if not compile_result['success']:
+            rows_out = len(result['data']) if 'data' in result else result.get('affected_rows', 0)
+            tree['actual'] = {
+                'time_ms': elapsed * 1000,
+                'rows_out': rows_out,
+                'buffer': io_statistics_delta(io_before, self._io_statistics())
+            }
+        else:
+            current_user = self.get_current_user()
+            if not self._check_permission(execution_plan, current_user['user_id']):
                 return {
                     'success': False,
-                    'error': f"编译错误: {'; '.join(compile_result['errors'])}"
+                    'error': f"权限不足：无法执行 {execution_plan['type']} 操作"
+                }
+        
+        return {
+            'success': True,
+            'plan': tree,
+            'explain': format_explain(tree, explain['format'])
+        }
+    
+    def _copy_from(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        """从CSV/JSONL文件流式导入数据，整条语句只编译和检查权限一次"""
+        table_name = command['table_name']
+        # 读取文件之前先检查权限，没有INSERT权限时不暴露表和文件的任何信息
+        user_id = self.get_current_user()['user_id']
+        allowed = self._check_permission({'type': 'INSERT', 'table_name': table_name}, user_id)
+        if not allowed:
+            return {
+                'success': False,
+                'error': "权限不足：无法执行 INSERT 操作"
+            }
+        
+        table_info = self.engine.get_catalog().get(table_name)
+        if table_info is None:
+            return {
+                'success': False,
+                'error': f"表 '{table_name}' 不存在"
+            }
+        
+        loaded = 0
+        try:
+            columns = schema_columns(table_info['schema'])
+            names, rows = read_rows(command['path'], command['format'], columns)
+            if not names:
+                return {
+                    'success': True,
+                    'message': f"文件 {command['path']} 中没有数据",
+                    'affected_rows': 0
                 }
             
-            # 获取执行计划
-            execution_plan = compile_result['execution_plan']
-            if not execution_plan:
+            placeholders = ', '.join('?' for _ in names)
+            handle = self.prepare(f"INSERT INTO {table_name} ({', '.join(names)}) VALUES ({placeholders});")
+            permissions = {(user_id, 'INSERT', table_name): allowed}
+            try:
+                for line_no, values in rows:
+                    result = self._execute_prepared(handle, values, permissions)
+                    if not result['success']:
+                        return {
+                            'success': False,
+                            'error': f"第 {line_no} 行导入失败: {result['error']}（已导入 {loaded} 行）",
+                            'affected_rows': loaded
+                        }
+                    loaded += 1
+            finally:
+                self.close_prepared(handle)
+        except (OSError, ValueError) as e:
+            return {
+                'success': False,
+                'error': f"导入失败: {str(e)}（已导入 {loaded} 行）",
+                'affected_rows': loaded
+            }
+        
+        return {
+            'success': True,
+            'message': f"成功从 {command['path']} 导入 {loaded} 行到表 '{table_name}'",
+            'affected_rows': loaded
+        }
+    
+    def _copy_to(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        """把表中的数据导出为CSV/JSONL文件"""
+        result = self.execute_sql(f"SELECT * FROM {command['table_name']};")
+        if not result['success']:
+            return result
+        
+        data = result.get('data', [])
+        columns = result.get('columns')
+        try:
+            if not columns or columns == ['*']:
+                table_info = self.engine.get_catalog()[command['table_name']]
+                columns = [column[0] for column in schema_columns(table_info['schema'])]
+            written = write_rows(command['path'], command['format'], columns, data)
+        except (OSError, ValueError) as e:
+            return {
+                'success': False,
+                'error': f"导出失败: {str(e)}"
+            }
+        
+        return {
+            'success': True,
+            'message': f"成功从表 '{command['table_name']}' 导出 {written} 行到 {command['path']}"
+        }
+    
+    def _io_statistics(self) -> Optional[Dict[str, Any]]:
+        """获取存储层缓存统计的快照，存储层不提供统计时返回None"""
+        storage = getattr(self.engine, 'storage', None)
+        get_statistics = getattr(storage, 'get_cache_statistics', None)
+        if get_statistics is None:
+            return None
+        return dict(get_statistics())
+    
+    def prepare(self, sql: str) -> int:
+        """预编译带 ? 占位符的SQL语句，返回语句句柄"""
+        template = parse_sql_template(sql)
+        if template is None:
+            raise ValueError(f"无法预编译SQL语句: {sql}")
+        
+        handle = self._next_statement_handle
+        self._next_statement_handle += 1
+        self._prepared_statements[handle] = template
+        return handle
+    
+    def execute_prepared(self, handle: int, params: Sequence[Any] = ()) -> Dict[str, Any]:
+        """绑定参数并执行预编译语句"""
+        return self._execute_prepared(handle, params)
+    
+    def _execute_prepared(self, handle: int, params: Sequence[Any],
+                          permissions: Optional[Dict[Tuple, bool]] = None) -> Dict[str, Any]:
+        """绑定参数并执行预编译语句，permissions见 _execute_compiled"""
+        try:
+            if not self.is_authenticated():
                 return {
                     'success': False,
-                    'error': "执行计划生成失败"
+                    'error': '用户未登录，请先登录'
                 }
             
-            # 权限检查
-            current_user = self.get_current_user()
-            if not self._check_permission(execution_plan, current_user['user_id']):
+            template = self._prepared_statements.get(handle)
+            if template is None:
                 return {
                     'success': False,
-                    'error': f"权限不足：无法执行 {execution_plan['type']} 操作"
+                    'error': f"预编译语句不存在: {handle}"
                 }
             
-            # 执行计划
-            result = self.engine.execute_plan(execution_plan)
-            
-            # 同步目录
-            self._sync_catalogs()
+            try:
+                values = template.bind_values(tuple(params))
+                compile_result = self._compile_template(template, values)
+            except (TypeError, ValueError) as e:
+                return {
+                    'success': False,
+                    'error': f"参数错误: {str(e)}"
+                }
             
-            return result
+            return self._execute_compiled(compile_result, permissions)
             
         except Exception as e:
             return {
@@ -121,6 +344,219 @@ class DatabaseSystemV3:
                 'error': f"执行错误: {str(e)}"
             }
     
+    def close_prepared(self, handle: int) -> bool:
+        """释放预编译语句"""
+        return self._prepared_statements.pop(handle, None) is not None
+    
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> Dict[str, Any]:
+        """用多组参数重复执行同一条语句，遇到错误时停止"""
+        try:
+            handle = self.prepare(sql)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        executed = 0
+        affected_rows = 0
+        permissions = {}
+        try:
+            for row in rows:
+                result = self._execute_prepared(handle, row, permissions)
+                if not result['success']:
+                    return {
+                        'success': False,
+                        'error': f"第 {executed + 1} 组参数执行失败: {result['error']}",
+                        'affected_rows': affected_rows
+                    }
+                executed += 1
+                affected_rows += result.get('affected_rows', 0)
+        finally:
+            self.close_prepared(handle)
+        
+        return {
+            'success': True,
+            'message': f"成功执行 {executed} 组参数",
+            'affected_rows': affected_rows
+        }
+    
+    def execute_script(self, stream: TextIO, progress_interval: int = 1000) -> Dict[str, Any]:
+        """流式执行SQL脚本，逐条编译执行，单条语句出错不影响后续语句"""
+        executed = 0
+        failed = 0
+        start_time = time.time()
+        
+        for line, sql in iter_sql_statements(stream):
+            result = self.execute_sql(sql)
+            executed += 1
+            
+            if not result['success']:
+                failed += 1
+                print(f"❌ 第 {executed} 条语句（第 {line} 行）: {result['error']}")
+            elif 'data' in result or 'explain' in result:
+                print(f"\n第 {executed} 条语句（第 {line} 行）: {sql}")
+                self._print_result(result)
+            
+            if progress_interval and executed % progress_interval == 0:
+                print(f"已执行 {executed} 条语句，失败 {failed} 条，耗时 {time.time() - start_time:.1f} 秒")
+        
+        elapsed = time.time() - start_time
+        print(f"\n脚本执行完成: 共 {executed} 条语句，成功 {executed - failed} 条，失败 {failed} 条，耗时 {elapsed:.2f} 秒")
+        return {
+            'success': failed == 0,
+            'executed': executed,
+            'failed': failed,
+            'elapsed': elapsed
+        }
+    
+    def _execute_compiled(self, compile_result: Dict[str, Any],
+                          permissions: Optional[Dict[Tuple, bool]] = None) -> Dict[str, Any]:
+        """检查权限并执行编译结果
+
+        permissions为executemany或COPY单次调用内的权限检查结果，
+        同一调用中对同一张表的同类操作只检查一次；为None时每次都检查
+        """
+        if not compile_result['success']:
+            return {
+                'success': False,
+                'error': f"编译错误: {'; '.join(compile_result['errors'])}"
+            }
+        
+        # 获取执行计划
+        execution_plan = compile_result['execution_plan']
+        if not execution_plan:
+            return {
+                'success': False,
+                'error': "执行计划生成失败"
+            }
+        
+        # 权限检查
+        current_user = self.get_current_user()
+        key = (current_user['user_id'], execution_plan['type'], execution_plan.get('table_name'))
+        if permissions is not None and key in permissions:
+            allowed = permissions[key]
+        else:
+            allowed = self._check_permission(execution_plan, current_user['user_id'])
+            if permissions is not None:
+                permissions[key] = allowed
+        if not allowed:
+            return {
+                'success': False,
+                'error': f"权限不足：无法执行 {execution_plan['type']} 操作"
+            }
+        
+        # 化简WHERE条件，条件恒假时不扫描直接返回空结果
+        execution_plan, always_false = simplify_plan(execution_plan)
+        if always_false:
+            return self._empty_result(execution_plan)
+        
+        # 执行计划
+        result = self.engine.execute_plan(execution_plan)
+        
+        # DDL只同步被修改的表并递增其目录版本，DML不需要同步目录
+        if execution_plan['type'] in DDL_PLAN_TYPES:
+            self.catalog.apply_ddl(execution_plan.get('table_name'), self.engine.get_catalog(),
+                                   self.compiler.semantic_analyzer.catalog)
+        
+        return result
+    
+    def _empty_result(self, execution_plan: Dict[str, Any]) -> Dict[str, Any]:
+        """WHERE条件恒假时的执行结果"""
+        plan_type = execution_plan['type']
+        if plan_type == 'UPDATE':
+            return {'success': True, 'message': "成功更新 0 条记录", 'affected_rows': 0}
+        if plan_type == 'DELETE':
+            return {'success': True, 'message': "成功删除 0 条记录", 'affected_rows': 0}
+        
+        columns = execution_plan.get('columns')
+        if not isinstance(columns, list) or not columns or not all(
+                isinstance(column, str) and column != '*' for column in columns):
+            table_info = self.engine.get_catalog().get(execution_plan.get('table_name'))
+            columns = [column[0] for column in schema_columns(table_info['schema'])] if table_info else []
+        return {'success': True, 'data': [], 'columns': columns}
+    
+    def _compile(self, sql: str) -> Dict[str, Any]:
+        """编译SQL语句，DML语句优先使用执行计划缓存"""
+        template = parse_sql_template(sql)
+        if template is None or template.param_count:
+            return self.compiler.compile(sql)
+        return self._compile_template(template, template.bind_values(), sql)
+    
+    def _compile_template(self, template: SQLTemplate, values: List[Any],
+                          sql: Optional[str] = None) -> Dict[str, Any]:
+        """编译绑定了字面量的模板，sql为模板对应的原始语句"""
+        if sql is None:
+            sql = template.render(values)
+        if not template.cacheable:
+            return self.compiler.compile(sql)
+        
+        key = template.cache_key(values)
+        entry = self.plan_cache.lookup(key, self.catalog.version, values)
+        if entry is None:
+            # 用占位值编译一次，记录字面量在计划中的位置
+            sentinel_sql, sentinels = template.render_sentinels(values)
+            compile_result = self.compiler.compile(sentinel_sql)
+            plan = compile_result['execution_plan'] if compile_result['success'] else None
+            entry = CachedPlan.build(plan, sentinels, self.catalog.version)
+            if entry.plan is not None and not self._set_length_limits(entry, template, values):
+                entry = CachedPlan.build(None, sentinels, self.catalog.version)
+            self.plan_cache.store(key, entry)
+        
+        # 占位值编译没有验证真实值的长度和范围，超出时用真实值完整编译
+        if entry.plan is None or not entry.values_fit(values):
+            return self.compiler.compile(sql)
+        
+        return {
+            'success': True,
+            'errors': [],
+            'execution_plan': entry.bind(values)
+        }
+    
+    def _set_length_limits(self, entry: CachedPlan, template: SQLTemplate, values: List[Any]) -> bool:
+        """按表结构记录写入字符串列的槽位的长度上限，无法确定写入的列时返回False"""
+        columns, unknown = stored_value_columns(template)
+        strings = {index for index, value in enumerate(values) if isinstance(value, str)}
+        if strings & unknown:
+            return False
+        strings &= set(columns)
+        if not strings:
+            return True
+        
+        table_info = self.engine.get_catalog().get(entry.plan.get('table_name'))
+        if table_info is None:
+            return False
+        try:
+            schema = schema_columns(table_info['schema'])
+        except (KeyError, ValueError):
+            return False
+        by_name = {column[0].lower(): column for column in schema}
+        
+        for index in strings:
+            column = columns[index]
+            if isinstance(column, int):
+                info = schema[column] if column < len(schema) else None
+            else:
+                info = by_name.get(column.lower())
+            if info is None:
+                return False
+            if info[2]:
+                entry.length_limits[index] = int(info[2])
+        return True
+    
+    def print_plan_cache_info(self):
+        """打印执行计划缓存统计"""
+        stats = self.plan_cache.get_statistics()
+        print("执行计划缓存:")
+        print(f"  容量: {stats['capacity']}")
+        print(f"  缓存计划数: {stats['size']}")
+        print(f"  命中次数: {stats['hits']}")
+        print(f"  未命中次数: {stats['misses']}")
+        print(f"  淘汰次数: {stats['evictions']}")
+        print(f"  失效次数: {stats['invalidations']}")
+        print(f"  不可缓存次数: {stats['uncacheable']}")
+        print(f"  命中率: {stats['hit_rate']:.2%}")
+    
     def _check_permission(self, execution_plan: Dict[str, Any], user_id: int) -> bool:
         """检查执行权限"""
         plan_type = execution_plan['type']
@@ -181,6 +617,7 @@ class DatabaseSystemV3:
                     self.show_help()
                 elif sql.lower() == 'info':
                     self.engine.print_database_info()
+                    self.print_plan_cache_info()
                 elif sql.lower() == 'catalog':
                     self.engine.print_catalog()
                 elif sql.lower() == 'logout':
@@ -230,6 +667,9 @@ class DatabaseSystemV3:
             if 'message' in result:
                 print(f"✅ {result['message']}")
             
+            if 'explain' in result:
+                print(result['explain'])
+            
             if 'data' in result:
                 self._print_query_result(result['data'], result.get('columns', []))
             
@@ -288,6 +728,14 @@ class DatabaseSystemV3:
 6. 删除表:
    DROP TABLE table_name;
 
+7. 批量导入导出:
+   COPY table_name FROM 'file.csv' (FORMAT csv);
+   COPY table_name TO 'file.jsonl' (FORMAT jsonl);
+
+8. 查看执行计划:
+   EXPLAIN [FORMAT TEXT|JSON] statement;
+   EXPLAIN ANALYZE [FORMAT TEXT|JSON] statement;   (实际执行，显示耗时、行数和页面I/O)
+
 支持的数据类型:
 - INT: 整数
 - VARCHAR(n): 变长字符串
@@ -368,9 +816,11 @@ def main():
                 return
             
             with open(sys.argv[1], 'r', encoding='utf-8') as f:
-                sql_script = f.read()
-                result = db.execute_sql(sql_script)
-                db._print_result(result)
+                result = db.execute_script(f)
+            
+            # 有语句执行失败时以非零状态退出，便于在脚本和CI中检查
+            if result['failed']:
+                sys.exit(1)
     else:
         # 交互式模式
         db = DatabaseSystemV3()
@@ -144,8 +144,8 @@ class DatabaseSystemWithDiskManagement(DatabaseSystemV3):
         self.storage_adjuster.stop_monitoring()
         self.auto_cleanup_manager.stop_monitoring()
         
-        # 关闭执行引擎
-        if hasattr(self.engine, 'shutdown'):
+        # 关闭执行引擎（未使用过则无需创建）
+        if self._engine is not None and hasattr(self.engine, 'shutdown'):
             self.engine.shutdown()
         
         print("✅ 数据库系统已关闭")
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+执行计划缓存
+以去除字面量后的规范化SQL作为键缓存执行计划，命中时直接把字面量绑定进计划，
+跳过词法分析、语法分析、语义分析和计划生成
+"""
+
+import math
+import re
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Any, Optional, List, Tuple, Callable, Set, Union
+
+# 可以走缓存的语句类型（DDL会修改编译器目录，不能用占位值编译）
+CACHEABLE_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+# 编译模板时使用的占位值，取不会与真实计划内容冲突的值
+_SENTINEL_INT_BASE = 1946157056
+_SENTINEL_FLOAT_BASE = 1946157056.5
+
+# 占位值编译只验证过这个范围内的整数，超出范围时用真实值完整编译
+_INT_MIN = -2 ** 31
+_INT_MAX = 2 ** 31 - 1
+
+_TOKEN_RE = re.compile(r"""
+      (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<word>[^\W\d]\w*)
+    | (?P<quoted>"[^"]*"|`[^`]*`)
+    | (?P<param>\?)
+    | (?P<punct>(?:(?!--|/\*)[^\w\s'"`?])+)
+    | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+def _value_signature(value: Any) -> str:
+    """返回值的类型签名，NULL和布尔值直接以值参与签名"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, int):
+        return 'i'
+    if isinstance(value, float):
+        return 'f'
+    if isinstance(value, str):
+        return 's'
+    raise TypeError(f"不支持的参数类型: {type(value).__name__}")
+
+
+def render_literal(value: Any) -> str:
+    """把Python值渲染为SQL字面量"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, int):
+        return repr(value)
+    if isinstance(value, float):
+        # repr会输出 1e-05、inf 等SQL不支持的写法，统一用定点小数表示
+        if not math.isfinite(value):
+            raise ValueError(f"不支持的数值: {value!r}")
+        text = format(Decimal(repr(value)), 'f')
+        return text if '.' in text else text + '.0'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise TypeError(f"不支持的参数类型: {type(value).__name__}")
+
+
+def _is_bindable(value: Any) -> bool:
+    """检查值能否在缓存命中时直接绑定进计划"""
+    return not isinstance(value, bool) and isinstance(value, (int, float, str))
+
+
+def _sentinel(index: int, value: Any) -> Any:
+    """返回第index个槽位的占位值"""
+    if isinstance(value, str):
+        return f'?{index}'
+    if isinstance(value, float):
+        return _SENTINEL_FLOAT_BASE + index
+    return _SENTINEL_INT_BASE + index
+
+
+class SQLTemplate:
+    """去除字面量后的SQL模板"""
+
+    def __init__(self, tokens: List[str], fragments: List[str], slots: List[Tuple[str, Any]]):
+        """初始化模板
+
+        tokens为去除字面量后的词法单元，字面量和参数替换为 '?'；
+        fragments比slots多一个元素，依次为槽位之间的原始SQL文本；
+        每个槽位为 ('literal', 值) 或 ('param', 参数序号)
+        """
+        self.tokens = tokens
+        self.shape = ' '.join(tokens)
+        self.statement_type = tokens[0].upper()
+        self.fragments = fragments
+        self.slots = slots
+        self.param_count = sum(1 for kind, _ in slots if kind == 'param')
+
+    @property
+    def cacheable(self) -> bool:
+        """模板对应的语句能否走计划缓存"""
+        return self.statement_type in CACHEABLE_STATEMENTS
+
+    def bind_values(self, params: Tuple = ()) -> List[Any]:
+        """按槽位顺序合并字面量和参数"""
+        if len(params) != self.param_count:
+            raise ValueError(f"参数个数不匹配: 需要 {self.param_count} 个，实际 {len(params)} 个")
+        return [params[item] if kind == 'param' else item for kind, item in self.slots]
+
+    def cache_key(self, values: List[Any]) -> Tuple[str, Tuple[str, ...]]:
+        """缓存键: 语句形状 + 各槽位的类型签名"""
+        return self.shape, tuple(_value_signature(value) for value in values)
+
+    def render(self, values: List[Any]) -> str:
+        """以真实值渲染SQL"""
+        return self._join(render_literal(value) for value in values)
+
+    def render_sentinels(self, values: List[Any]) -> Tuple[str, List[Any]]:
+        """以占位值渲染SQL，返回SQL和每个槽位的占位值（不可绑定的槽位为None）"""
+        sentinels = [_sentinel(i, value) if _is_bindable(value) else None
+                     for i, value in enumerate(values)]
+        rendered = (render_literal(value if sentinel is None else sentinel)
+                    for value, sentinel in zip(values, sentinels))
+        return self._join(rendered), sentinels
+
+    def _join(self, literals) -> str:
+        """把字面量依次填回槽位"""
+        parts = [self.fragments[0]]
+        for literal, fragment in zip(literals, self.fragments[1:]):
+            parts.append(literal)
+            parts.append(fragment)
+        return ''.join(parts)
+
+
+def parse_sql_template(sql: str) -> Optional[SQLTemplate]:
+    """把SQL拆成模板，无法安全规范化（多语句、未闭合字符串等）时返回None"""
+    shape_tokens = []
+    fragments = []
+    slots = []
+    fragment_start = 0
+    semicolons = 0
+
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        text = match.group()
+
+        if kind in ('ws', 'comment'):
+            continue
+        if kind == 'other':
+            return None
+
+        if kind in ('string', 'number', 'param'):
+            if kind == 'string':
+                slots.append(('literal', text[1:-1].replace("''", "'")))
+            elif kind == 'number':
+                slots.append(('literal', float(text) if '.' in text else int(text)))
+            else:
+                param_index = sum(1 for slot_kind, _ in slots if slot_kind == 'param')
+                slots.append(('param', param_index))
+            fragments.append(sql[fragment_start:match.start()])
+            fragment_start = match.end()
+            shape_tokens.append('?')
+            continue
+
+        if kind == 'punct' and ';' in text:
+            semicolons += text.count(';')
+        shape_tokens.append(text)
+
+    fragments.append(sql[fragment_start:])
+
+    if not shape_tokens:
+        return None
+    # 只接受单条语句，分号只能出现在末尾
+    if semicolons > 1 or (semicolons == 1 and not shape_tokens[-1].endswith(';')):
+        return None
+
+    return SQLTemplate(shape_tokens, fragments, slots)
+
+
+def _pieces(tokens: List[str], start: int, end: int) -> List[Tuple[str, Optional[int]]]:
+    """把词法单元拆成 (文本, 槽位序号)，符号逐字符拆开，非槽位的序号为None"""
+    slot_index = sum(1 for token in tokens[:start] if token == '?')
+    pieces = []
+    for token in tokens[start:end]:
+        if token == '?':
+            pieces.append((token, slot_index))
+            slot_index += 1
+        elif token[0].isalnum() or token[0] in '_"`':
+            pieces.append((token, None))
+        else:
+            pieces.extend((char, None) for char in token)
+    return pieces
+
+
+def _split_items(pieces: List[Tuple[str, Optional[int]]], row_level: int) -> List[Tuple[int, List]]:
+    """按逗号切分值列表，返回 [(在行中的位置, 该项的pieces)]
+
+    row_level为值所在的括号深度：INSERT的VALUES为1，UPDATE的SET为0
+    """
+    items = []
+    depth = 0
+    position = 0
+    item = []
+    for piece in pieces:
+        text = piece[0]
+        if text == '(':
+            depth += 1
+            if depth == row_level:
+                position, item = 0, []
+                continue
+        elif text == ')':
+            depth -= 1
+            if depth == row_level - 1:
+                if item:
+                    items.append((position, item))
+                item = []
+                continue
+        elif text == ',' and depth == row_level:
+            items.append((position, item))
+            position, item = position + 1, []
+            continue
+        elif text == ';' and depth == 0:
+            continue
+        if depth >= row_level:
+            item.append(piece)
+    if item:
+        items.append((position, item))
+    return items
+
+
+def _identifier(token: str) -> str:
+    """去掉标识符的引号"""
+    return token[1:-1] if token[0] in '"`' else token
+
+
+def stored_value_columns(template: SQLTemplate) -> Tuple[Dict[int, Union[str, int]], Set[int]]:
+    """找出INSERT的VALUES和UPDATE的SET中写入列的槽位
+
+    返回 ({槽位序号: 列名，INSERT未给列清单时为列序号}, 写入列但无法确定列的槽位)，
+    WHERE等其他位置的槽位不在结果中
+    """
+    tokens = template.tokens
+    upper = [token.upper() for token in tokens]
+    columns: Dict[int, Union[str, int]] = {}
+    unknown: Set[int] = set()
+
+    if template.statement_type == 'INSERT':
+        if 'VALUES' not in upper:
+            unknown.update(range(len(template.slots)))
+            return columns, unknown
+        values_at = upper.index('VALUES')
+        # INSERT INTO 表名 [(列, ...)] VALUES
+        names = [_identifier(token) for token, _ in _pieces(tokens, 3, values_at)
+                 if token not in '(),']
+        for position, item in _split_items(_pieces(tokens, values_at + 1, len(tokens)), 1):
+            slots = [slot for _, slot in item if slot is not None]
+            if len(item) == 1 and slots:
+                if not names:
+                    columns[slots[0]] = position
+                elif position < len(names):
+                    columns[slots[0]] = names[position]
+                else:
+                    unknown.update(slots)
+            else:
+                unknown.update(slots)
+
+    elif template.statement_type == 'UPDATE':
+        if 'SET' not in upper:
+            unknown.update(range(len(template.slots)))
+            return columns, unknown
+        set_at = upper.index('SET')
+        end = upper.index('WHERE', set_at) if 'WHERE' in upper[set_at:] else len(tokens)
+        for _, item in _split_items(_pieces(tokens, set_at + 1, end), 0):
+            slots = [slot for _, slot in item if slot is not None]
+            if len(item) == 3 and item[1][0] == '=' and item[0][1] is None and item[2][1] is not None:
+                columns[item[2][1]] = _identifier(item[0][0])
+            else:
+                unknown.update(slots)
+
+    return columns, unknown
+
+
+def _locate(node: Any, targets: Dict[Any, int], path: Tuple, found: Dict[int, List]):
+    """在计划中查找占位值，记录其路径"""
+    if isinstance(node, dict):
+        items = node.items()
+    elif isinstance(node, list):
+        items = enumerate(node)
+    else:
+        return
+
+    for key, value in items:
+        if isinstance(value, (dict, list)):
+            _locate(value, targets, path + (key,), found)
+        elif not isinstance(value, bool) and isinstance(value, (int, float, str)):
+            index = targets.get(value)
+            if index is not None:
+                # 编译器可能把整数字面量转换成浮点数，绑定时保持同样的转换
+                as_float = isinstance(value, float)
+                found.setdefault(index, []).append((path + (key,), as_float))
+
+
+def _copy_plan(node: Any) -> Any:
+    """只复制计划中的dict和list，叶子值共享"""
+    if isinstance(node, dict):
+        return {key: _copy_plan(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_copy_plan(value) for value in node]
+    return node
+
+
+def _referenced_tables(plan: Dict[str, Any]) -> List[str]:
+    """获取计划引用的表"""
+    tables = []
+    if plan.get('table_name'):
+        tables.append(plan['table_name'])
+    for table_name in plan.get('tables') or []:
+        if isinstance(table_name, str) and table_name not in tables:
+            tables.append(table_name)
+    return tables
+
+
+class CachedPlan:
+    """缓存的执行计划"""
+
+    def __init__(self, plan: Optional[Dict[str, Any]], slot_paths: List[List[Tuple]],
+                 versions: Dict[Optional[str], int]):
+        """初始化缓存项
+
+        plan为None表示该形状无法走缓存（占位值编译失败或无法定位字面量），
+        此时versions只记录全局目录版本（键为None）
+        """
+        self.plan = plan
+        self.slot_paths = slot_paths
+        self.versions = versions
+        # 槽位序号 -> 写入列的最大长度，绑定前检查
+        self.length_limits: Dict[int, int] = {}
+
+    @classmethod
+    def build(cls, plan: Optional[Dict[str, Any]], sentinels: List[Any],
+              catalog_version: Callable[[Optional[str]], int]) -> 'CachedPlan':
+        """根据占位值编译出的计划构建缓存项"""
+        uncacheable = cls(None, [], {None: catalog_version(None)})
+        if not plan or plan.get('type') not in CACHEABLE_STATEMENTS:
+            return uncacheable
+
+        targets = {}
+        for index, sentinel in enumerate(sentinels):
+            if sentinel is not None:
+                targets[sentinel] = index
+        found = {}
+        _locate(plan, targets, (), found)
+        if len(found) != len(targets):
+            return uncacheable
+
+        slot_paths = [found.get(index, []) for index in range(len(sentinels))]
+        versions = {table: catalog_version(table) for table in _referenced_tables(plan)}
+        return cls(plan, slot_paths, versions)
+
+    def values_fit(self, values: List[Any]) -> bool:
+        """检查真实值是否在占位值编译验证过的范围内（字符串长度、整数范围）
+
+        不满足时需要用真实值完整编译，由语义分析给出结果
+        """
+        for index, length in self.length_limits.items():
+            if len(values[index]) > length:
+                return False
+        return all(_INT_MIN <= value <= _INT_MAX for value in values
+                   if isinstance(value, int) and not isinstance(value, bool))
+
+    def bind(self, values: List[Any]) -> Dict[str, Any]:
+        """把真实值绑定进计划副本"""
+        plan = _copy_plan(self.plan)
+        for value, paths in zip(values, self.slot_paths):
+            for path, as_float in paths:
+                node = plan
+                for key in path[:-1]:
+                    node = node[key]
+                node[path[-1]] = float(value) if as_float and isinstance(value, int) else value
+        return plan
+
+
+class PlanCache:
+    """有界LRU执行计划缓存"""
+
+    def __init__(self, capacity: int = 256):
+        """初始化缓存"""
+        self.capacity = capacity
+        self.entries: 'OrderedDict[Any, CachedPlan]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.uncacheable = 0
+
+    def lookup(self, key: Any, catalog_version: Callable[[Optional[str]], int],
+               values: Optional[List[Any]] = None) -> Optional[CachedPlan]:
+        """查找缓存项，引用表的目录版本变化时视为失效
+
+        命中不可缓存标记或values不满足绑定检查时仍需完整编译，计为未命中
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        for table_name, version in entry.versions.items():
+            if catalog_version(table_name) != version:
+                del self.entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+        self.entries.move_to_end(key)
+        if entry.plan is None:
+            self.misses += 1
+            self.uncacheable += 1
+        elif values is not None and not entry.values_fit(values):
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, key: Any, entry: CachedPlan):
+        """存入缓存项，超出容量时淘汰最久未使用的项"""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_table(self, table_name: Optional[str]):
+        """表结构变化时移除引用该表的缓存项（table_name为None时全部移除）
+
+        不可缓存标记依赖全局目录版本，也一并移除
+        """
+        stale = [key for key, entry in self.entries.items()
+                 if table_name is None or entry.plan is None or table_name in entry.versions]
+        for key in stale:
+            del self.entries[key]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        """清空缓存"""
+        self.entries.clear()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            'capacity': self.capacity,
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'uncacheable': self.uncacheable,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+SQL脚本流式切分
+按块读取脚本，按分号切分语句，正确跳过字符串字面量和注释中的分号，
+内存占用只与单条语句的长度有关，与脚本大小无关
+"""
+
+import re
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+# 普通状态下需要处理的字符
+_NORMAL_SPECIAL = re.compile(r"[;'\"\-/\n]")
+_BLOCK_COMMENT_SPECIAL = re.compile(r"[*\n]")
+
+_NORMAL = 0
+_QUOTE = 1
+_LINE_COMMENT = 2
+_BLOCK_COMMENT = 3
+
+
+class SQLStatementSplitter:
+    """增量SQL语句切分器"""
+
+    def __init__(self):
+        """初始化切分器"""
+        self.line = 1
+        self._state = _NORMAL
+        self._quote = ''
+        self._pending = ''
+        self._buffer: List[str] = []
+        self._start_line: Optional[int] = None
+
+    def feed(self, text: str) -> List[Tuple[int, str]]:
+        """输入一段脚本文本，返回已完整的语句列表 [(起始行号, 语句)]"""
+        return self._scan(self._pending + text, final=False)
+
+    def finish(self) -> List[Tuple[int, str]]:
+        """脚本结束，返回剩余语句（末尾没有分号的语句也会返回）"""
+        statements = self._scan(self._pending, final=True)
+        self._flush(statements)
+        self._state = _NORMAL
+        return statements
+
+    def _append(self, piece: str):
+        """追加语句文本，记录语句的起始行号"""
+        if not piece:
+            return
+        if self._start_line is None:
+            if piece.isspace():
+                return
+            self._start_line = self.line
+        self._buffer.append(piece)
+
+    def _flush(self, statements: List[Tuple[int, str]]):
+        """结束当前语句"""
+        statement = ''.join(self._buffer).strip()
+        if statement and statement != ';':
+            statements.append((self._start_line, statement))
+        self._buffer = []
+        self._start_line = None
+
+    def _scan(self, text: str, final: bool) -> List[Tuple[int, str]]:
+        """扫描文本，需要向后看一个字符但文本已结束时把该字符留到下次"""
+        statements = []
+        self._pending = ''
+        pos = 0
+        end = len(text)
+
+        while pos < end:
+            if self._state == _NORMAL:
+                match = _NORMAL_SPECIAL.search(text, pos)
+                if match is None:
+                    self._append(text[pos:])
+                    break
+                self._append(text[pos:match.start()])
+                pos = match.start()
+                char = text[pos]
+
+                if char == ';':
+                    self._append(';')
+                    self._flush(statements)
+                    pos += 1
+                elif char == '\n':
+                    self._append('\n')
+                    self.line += 1
+                    pos += 1
+                elif char in '\'"':
+                    self._append(char)
+                    self._state = _QUOTE
+                    self._quote = char
+                    pos += 1
+                else:
+                    # '-' 和 '/' 可能是注释的开始
+                    if pos + 1 >= end and not final:
+                        self._pending = char
+                        break
+                    following = text[pos + 1:pos + 2]
+                    if char == '-' and following == '-':
+                        self._state = _LINE_COMMENT
+                        pos += 2
+                    elif char == '/' and following == '*':
+                        self._state = _BLOCK_COMMENT
+                        self._append(' ')
+                        pos += 2
+                    else:
+                        self._append(char)
+                        pos += 1
+
+            elif self._state == _QUOTE:
+                close = text.find(self._quote, pos)
+                newline = text.find('\n', pos, close if close != -1 else end)
+                if newline != -1:
+                    self._append(text[pos:newline + 1])
+                    self.line += 1
+                    pos = newline + 1
+                    continue
+                if close == -1:
+                    self._append(text[pos:])
+                    break
+                # 连续两个引号是转义，仍在字符串内
+                if close + 1 >= end and not final:
+                    self._append(text[pos:close])
+                    self._pending = self._quote
+                    break
+                if text[close + 1:close + 2] == self._quote:
+                    self._append(text[pos:close + 2])
+                    pos = close + 2
+                else:
+                    self._append(text[pos:close + 1])
+                    self._state = _NORMAL
+                    pos = close + 1
+
+            elif self._state == _LINE_COMMENT:
+                newline = text.find('\n', pos)
+                if newline == -1:
+                    break
+                self._state = _NORMAL
+                pos = newline
+
+            else:
+                match = _BLOCK_COMMENT_SPECIAL.search(text, pos)
+                if match is None:
+                    break
+                pos = match.start()
+                if text[pos] == '\n':
+                    self.line += 1
+                    pos += 1
+                elif pos + 1 >= end and not final:
+                    self._pending = '*'
+                    break
+                elif text[pos + 1:pos + 2] == '/':
+                    self._state = _NORMAL
+                    pos += 2
+                else:
+                    pos += 1
+
+        return statements
+
+
+def iter_sql_statements(stream: TextIO, chunk_size: int = 64 * 1024) -> Iterator[Tuple[int, str]]:
+    """逐条产出脚本中的语句 (起始行号, 语句)，按块读取"""
+    splitter = SQLStatementSplitter()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield from splitter.feed(chunk)
+    yield from splitter.finish()
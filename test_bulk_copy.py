@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+COPY批量导入导出测试
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_copy import parse_copy, schema_columns, convert_value, read_rows, write_rows
+
+SCHEMA = {
+    'columns': [
+        {'name': 'id', 'type': {'type': 'int'}, 'constraints': []},
+        {'name': 'name', 'type': {'type': 'varchar', 'length': 5}, 'constraints': []},
+        {'name': 'score', 'type': {'type': 'float'}, 'constraints': []}
+    ]
+}
+
+
+def test_parse_copy():
+    """测试COPY语句解析"""
+    command = parse_copy("COPY tst1 FROM 'data/it''s.csv' (FORMAT csv);")
+    assert command == {'table_name': 'tst1', 'direction': 'FROM', 'path': "data/it's.csv", 'format': 'csv'}
+    assert parse_copy("copy tst1 to 'out.jsonl'")['format'] == 'jsonl'
+    assert parse_copy("SELECT * FROM tst1;") is None
+
+
+def test_schema_and_convert():
+    """测试表结构解析和类型校验"""
+    columns = schema_columns(SCHEMA)
+    assert columns == [('id', 'int', None), ('name', 'varchar', 5), ('score', 'float', None)]
+    # 字典形式的表结构
+    assert schema_columns({'columns': {'id': {'type': {'type': 'INT'}}}}) == [('id', 'int', None)]
+
+    assert convert_value('42', columns[0]) == 42
+    assert convert_value(None, columns[0]) is None
+    assert convert_value('', columns[1]) == ''
+    assert convert_value('1.5', columns[2]) == 1.5
+    for value, column in (('abc', columns[0]), ('', columns[0]), ('toolong', columns[1]), (True, columns[0])):
+        try:
+            convert_value(value, column)
+            assert False, f"{value!r} 应该校验失败"
+        except ValueError:
+            pass
+
+
+def test_roundtrip():
+    """测试CSV和JSONL导出后再导入"""
+    columns = schema_columns(SCHEMA)
+    rows = [{'id': 1, 'name': 'Alice', 'score': 85.5}, {'id': 2, 'name': 'Bo,b', 'score': None},
+            {'id': 3, 'name': '', 'score': None}, {'id': None, 'name': None, 'score': 1.0},
+            {'id': 5, 'name': 'a\n"b"', 'score': None}]
+    with tempfile.TemporaryDirectory() as tmp:
+        for file_format in ('csv', 'jsonl'):
+            path = os.path.join(tmp, f'rows.{file_format}')
+            assert write_rows(path, file_format, ['id', 'name', 'score'], rows) == 5
+            names, loaded = read_rows(path, file_format, columns)
+            assert names == ['id', 'name', 'score']
+            # 空字符串和NULL导出再导入后保持不同
+            assert [values for _, values in loaded] == [[1, 'Alice', 85.5], [2, 'Bo,b', None], [3, '', None],
+                                                        [None, None, 1.0], [5, 'a\n"b"', None]]
+
+        # CSV中未加引号的空字段为NULL，"" 为空字符串；JSONL中的 "" 始终是空字符串
+        path = os.path.join(tmp, 'empty.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('id,name\n1,\n2,""\n\n3,"x"\n')
+        names, loaded = read_rows(path, 'csv', columns)
+        assert [(line_no, values) for line_no, values in loaded] == [(2, [1, None]), (3, [2, '']), (5, [3, 'x'])]
+        path = os.path.join(tmp, 'empty.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"id": 1, "name": ""}\n{"id": 2, "name": null}\n')
+        names, loaded = read_rows(path, 'jsonl', columns)
+        assert [values for _, values in loaded] == [[1, '', None], [2, None, None]]
+
+        path = os.path.join(tmp, 'bad.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("id,name\n1,ok\nx,bad\n")
+        names, loaded = read_rows(path, 'csv', columns)
+        try:
+            list(loaded)
+            assert False, "类型错误应该报错"
+        except ValueError as e:
+            assert str(e).startswith("第 3 行")
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("COPY批量导入导出测试")
+    print("=" * 60)
+
+    tests = [test_parse_copy, test_schema_and_convert, test_roundtrip]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+    print(f"\n测试结果: {passed}/{len(tests)} 通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+WHERE条件化简测试
+"""
+
+import os
+import sys
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from condition_simplifier import simplify_condition, simplify_plan
+
+
+def column(name):
+    """列引用节点"""
+    return {'type': 'COLUMN', 'name': name}
+
+
+def number(value):
+    """数字字面量节点"""
+    return {'type': 'NUMBER', 'value': value}
+
+
+def compare(operator, left, right):
+    """比较节点"""
+    return {'type': 'COMPARISON', 'operator': operator, 'left': left, 'right': right}
+
+
+def binary(operator, left, right):
+    """算术运算节点"""
+    return {'type': 'BINARY_OP', 'operator': operator, 'left': left, 'right': right}
+
+
+def logical(operator, left, right):
+    """逻辑运算节点"""
+    return {'type': 'LOGICAL', 'operator': operator, 'left': left, 'right': right}
+
+
+def test_constant_folding():
+    """测试折叠数字字面量子表达式并去掉恒真条件"""
+    # 1 = 1 AND age > 10 + 5
+    condition = logical('AND', compare('=', number(1), number(1)),
+                        compare('>', column('age'), binary('+', number(10), number(5))))
+    assert simplify_condition(condition) == compare('>', column('age'), number(15))
+
+    assert simplify_condition(compare('<', binary('*', number(2), number(3)), number(7))) is True
+    assert simplify_condition(compare('=', number(1), number(2))) is False
+
+    # 不能整除的除法和除零不折叠
+    condition = compare('>', column('age'), binary('/', number(7), number(2)))
+    assert simplify_condition(condition) is condition
+    condition = compare('>', column('age'), binary('/', number(7), number(0)))
+    assert simplify_condition(condition) is condition
+    assert simplify_condition(compare('=', column('age'), binary('/', number(8), number(2)))) == \
+        compare('=', column('age'), number(4))
+
+    # OR链中恒真使整条链恒真，恒假的分支被去掉
+    assert simplify_condition(logical('OR', compare('=', number(1), number(1)), compare('=', column('a'), number(2)))) is True
+    assert simplify_condition(logical('OR', compare('=', number(1), number(2)), compare('=', column('a'), number(2)))) == \
+        compare('=', column('a'), number(2))
+
+
+def test_range_merging():
+    """测试合并同一列上的范围条件和发现空范围"""
+    # age > 3 AND age >= 5 AND age < 9 AND 20 >= age
+    condition = logical('AND',
+                        logical('AND', compare('>', column('age'), number(3)), compare('>=', column('age'), number(5))),
+                        logical('AND', compare('<', column('age'), number(9)), compare('>=', number(20), column('age'))))
+    assert simplify_condition(condition) == logical('AND', compare('>=', column('age'), number(5)),
+                                                    compare('<', column('age'), number(9)))
+
+    assert simplify_condition(logical('AND', compare('>', column('age'), number(30)),
+                                      compare('<', column('age'), number(10)))) is False
+    assert simplify_condition(logical('AND', compare('>', column('age'), number(5)),
+                                      compare('<=', column('age'), number(5)))) is False
+    assert simplify_condition(logical('AND', compare('=', column('id'), number(1)),
+                                      compare('=', column('id'), number(2)))) is False
+    assert simplify_condition(logical('AND', compare('=', column('id'), number(3)),
+                                      compare('>', column('id'), number(1)))) == compare('=', column('id'), number(3))
+
+    # 不同列的条件保持不变
+    condition = logical('AND', compare('>', column('a'), number(1)), compare('<', column('b'), number(0)))
+    assert simplify_condition(condition) is condition
+
+    # 表名限定不同的同名列不合并
+    a_id = {'type': 'COLUMN', 'name': 'id', 'table': 'a'}
+    b_id = {'type': 'COLUMN', 'name': 'id', 'table': 'b'}
+    condition = logical('AND', compare('>', a_id, number(5)), compare('<', b_id, number(3)))
+    assert simplify_condition(condition) is condition
+    assert simplify_condition(logical('AND', compare('>', a_id, number(5)),
+                                      compare('<', dict(a_id), number(3)))) is False
+
+    # NOT之下NULL和假不等价，不合并范围
+    inner = logical('AND', compare('>', column('a'), number(5)), compare('<', column('a'), number(3)))
+    condition = {'type': 'UNARY_OP', 'operator': 'NOT', 'operand': inner}
+    assert simplify_condition(condition) is condition
+
+
+def test_simplify_plan():
+    """测试执行计划的WHERE条件改写，不修改原计划"""
+    where_clause = logical('AND', compare('=', number(1), number(1)), compare('>', column('age'), number(20)))
+    plan = {'type': 'SELECT', 'table_name': 'tst1', 'columns': ['*'], 'where_clause': where_clause}
+    simplified, always_false = simplify_plan(plan)
+    assert not always_false
+    assert simplified['where_clause'] == compare('>', column('age'), number(20))
+    assert plan['where_clause'] is where_clause
+
+    plan = dict(plan, where_clause=compare('=', number(1), number(1)))
+    assert simplify_plan(plan) == (dict(plan, where_clause=None), False)
+
+    contradiction = compare('=', number(1), number(0))
+    assert simplify_plan(dict(plan, where_clause=contradiction))[1] is True
+    assert simplify_plan({'type': 'DELETE', 'table_name': 'tst1', 'where_clause': contradiction})[1] is True
+
+    # 聚合在没有输入行时仍输出一行，不能直接返回空结果
+    plan = {'type': 'SELECT', 'table_name': 'tst1', 'columns': ['COUNT(*)'], 'where_clause': contradiction}
+    assert simplify_plan(plan) == (plan, False)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("WHERE条件化简测试")
+    print("=" * 60)
+
+    tests = [test_constant_folding, test_range_merging, test_simplify_plan]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+    print(f"\n测试结果: {passed}/{len(tests)} 通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,867 @@
+#!/usr/bin/env python3
+"""
+DatabaseSystemV3 端到端测试
+用桩模块替换存储适配器、权限模块、SQL编译器和执行引擎，
+驱动 execute_sql、预编译语句、COPY、EXPLAIN 和DDL目录同步的完整流程
+"""
+
+import importlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+import types
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+# ==================== 存储和权限桩模块 ====================
+
+class StubStorageAdapter:
+    """存储适配器桩"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+
+class StubAuthManager:
+    """只有 admin/admin123 一个用户的认证管理器桩"""
+
+    def __init__(self, storage_adapter):
+        self.current_user = None
+
+    def login(self, username, password):
+        if (username, password) != ('admin', 'admin123'):
+            return False
+        self.current_user = {'user_id': 1, 'username': 'admin', 'role': 'admin', 'is_active': True}
+        return True
+
+    def logout(self):
+        self.current_user = None
+        return True
+
+    def is_authenticated(self):
+        return self.current_user is not None
+
+    def get_current_user(self):
+        return self.current_user
+
+
+class StubPermissionManager:
+    """权限管理器桩，denied中的 (表名, 权限类型) 没有权限"""
+
+    def __init__(self, storage_adapter, auth_manager):
+        self.denied = set()
+        self.calls = []
+
+    def check_permission(self, user_id, table_name, permission_type):
+        self.calls.append((user_id, table_name, permission_type))
+        return (table_name, permission_type) not in self.denied
+
+
+# ==================== SQL编译器桩 ====================
+
+_TOKEN_RE = re.compile(r"\s*(?:(?P<string>'(?:[^']|'')*')|(?P<number>\d+(?:\.\d+)?)|(?P<word>[A-Za-z_]\w*)"
+                       r"|(?P<op><=|>=|!=|<>|[=<>+\-*/(),;]))")
+
+
+class StubSemanticAnalyzer:
+    """语义分析器桩，只保存目录"""
+
+    def __init__(self):
+        self.catalog = {}
+
+
+class StubCompiler:
+    """只支持测试用到的语句的SQL编译器桩，生成与SQLCompilerV3相同形状的执行计划"""
+
+    def __init__(self):
+        self.semantic_analyzer = StubSemanticAnalyzer()
+        self.compiled = []
+
+    def compile(self, sql):
+        self.compiled.append(sql)
+        try:
+            self.tokens = self._tokenize(sql)
+            self.pos = 0
+            plan = self._statement()
+        except ValueError as e:
+            return {'success': False, 'errors': [str(e)], 'execution_plan': None}
+        return {'success': True, 'errors': [], 'execution_plan': plan}
+
+    # ---------- 词法 ----------
+
+    def _tokenize(self, sql):
+        tokens = []
+        pos = 0
+        sql = sql.strip()
+        while pos < len(sql):
+            match = _TOKEN_RE.match(sql, pos)
+            if not match:
+                raise ValueError(f"词法错误: {sql[pos:]}")
+            kind = match.lastgroup
+            text = match.group(kind)
+            if kind == 'string':
+                tokens.append(('STRING', text[1:-1].replace("''", "'")))
+            elif kind == 'number':
+                tokens.append(('NUMBER', float(text) if '.' in text else int(text)))
+            elif kind == 'word':
+                tokens.append(('WORD', text))
+            else:
+                tokens.append(('OP', text))
+            pos = match.end()
+        return tokens
+
+    def _peek(self, text=None):
+        token = self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+        if text is None:
+            return token
+        return token[1] is not None and str(token[1]).upper() == text
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise ValueError("语法错误: 语句不完整")
+        self.pos += 1
+        return token
+
+    def _expect(self, text):
+        kind, value = self._next()
+        if str(value).upper() != text:
+            raise ValueError(f"语法错误: 需要 {text}，实际 {value}")
+
+    def _name(self):
+        kind, value = self._next()
+        if kind != 'WORD':
+            raise ValueError(f"语法错误: 需要标识符，实际 {value}")
+        return value
+
+    # ---------- 语句 ----------
+
+    def _statement(self):
+        keyword = self._name().upper()
+        plan = getattr(self, '_' + keyword.lower())()
+        if self._peek(';'):
+            self.pos += 1
+        if self._peek()[0] is not None:
+            raise ValueError(f"语法错误: 多余的 {self._peek()[1]}")
+        return plan
+
+    def _schema(self, table_name):
+        schema = self.semantic_analyzer.catalog.get(table_name)
+        if schema is None:
+            raise ValueError(f"语义错误: 表 '{table_name}' 不存在")
+        return schema['columns']
+
+    def _create(self):
+        self._expect('TABLE')
+        table_name = self._name()
+        if table_name in self.semantic_analyzer.catalog:
+            raise ValueError(f"语义错误: 表 '{table_name}' 已存在")
+        self._expect('(')
+        columns = []
+        while True:
+            name = self._name()
+            type_name = self._name().upper()
+            column_type = {'type': type_name}
+            if self._peek('('):
+                self.pos += 1
+                column_type['length'] = self._next()[1]
+                self._expect(')')
+            columns.append({'name': name, 'type': column_type})
+            if self._peek(','):
+                self.pos += 1
+                continue
+            self._expect(')')
+            break
+        # 与SQLCompilerV3一样，编译DDL时就修改语义分析器的目录
+        self.semantic_analyzer.catalog[table_name] = {'columns': columns}
+        return {'type': 'CREATE_TABLE', 'table_name': table_name, 'columns': columns}
+
+    def _drop(self):
+        self._expect('TABLE')
+        table_name = self._name()
+        self._schema(table_name)
+        del self.semantic_analyzer.catalog[table_name]
+        return {'type': 'DROP_TABLE', 'table_name': table_name}
+
+    def _check_value(self, column, value):
+        """按列类型检查写入的值"""
+        type_name = column['type']['type']
+        if value is None:
+            return
+        if type_name == 'INT' and not isinstance(value, int):
+            raise ValueError(f"语义错误: 列 '{column['name']}' 需要INT")
+        if type_name == 'VARCHAR':
+            if not isinstance(value, str):
+                raise ValueError(f"语义错误: 列 '{column['name']}' 需要VARCHAR")
+            if len(value) > column['type']['length']:
+                raise ValueError(f"语义错误: 列 '{column['name']}' 的值超过长度 {column['type']['length']}")
+
+    def _literal(self):
+        kind, value = self._next()
+        if kind == 'OP' and value == '-':
+            return -self._next()[1]
+        if kind == 'WORD' and value.upper() == 'NULL':
+            return None
+        if kind not in ('NUMBER', 'STRING'):
+            raise ValueError(f"语法错误: 需要字面量，实际 {value}")
+        return value
+
+    def _insert(self):
+        self._expect('INTO')
+        table_name = self._name()
+        schema = self._schema(table_name)
+        by_name = {column['name']: column for column in schema}
+        names = [column['name'] for column in schema]
+        if self._peek('('):
+            self.pos += 1
+            names = [self._name()]
+            while self._peek(','):
+                self.pos += 1
+                names.append(self._name())
+            self._expect(')')
+        self._expect('VALUES')
+        rows = []
+        while True:
+            self._expect('(')
+            row = [self._literal()]
+            while self._peek(','):
+                self.pos += 1
+                row.append(self._literal())
+            self._expect(')')
+            if len(row) != len(names):
+                raise ValueError(f"语义错误: 需要 {len(names)} 个值，实际 {len(row)} 个")
+            for name, value in zip(names, row):
+                if name not in by_name:
+                    raise ValueError(f"语义错误: 列 '{name}' 不存在")
+                self._check_value(by_name[name], value)
+            rows.append(row)
+            if not self._peek(','):
+                break
+            self.pos += 1
+        return {'type': 'INSERT', 'table_name': table_name, 'columns': names, 'values': rows}
+
+    def _select(self):
+        columns = []
+        if self._peek('*'):
+            self.pos += 1
+            columns = ['*']
+        else:
+            columns.append(self._name())
+            while self._peek(','):
+                self.pos += 1
+                columns.append(self._name())
+        self._expect('FROM')
+        table_name = self._name()
+        schema_names = [column['name'] for column in self._schema(table_name)]
+        for name in columns:
+            if name != '*' and name not in schema_names:
+                raise ValueError(f"语义错误: 列 '{name}' 不存在")
+        return {'type': 'SELECT', 'table_name': table_name, 'columns': columns,
+                'where_clause': self._where(schema_names)}
+
+    def _update(self):
+        table_name = self._name()
+        schema = self._schema(table_name)
+        by_name = {column['name']: column for column in schema}
+        self._expect('SET')
+        assignments = {}
+        while True:
+            name = self._name()
+            if name not in by_name:
+                raise ValueError(f"语义错误: 列 '{name}' 不存在")
+            self._expect('=')
+            value = self._literal()
+            self._check_value(by_name[name], value)
+            assignments[name] = value
+            if not self._peek(','):
+                break
+            self.pos += 1
+        return {'type': 'UPDATE', 'table_name': table_name, 'set_clause': assignments,
+                'where_clause': self._where(list(by_name))}
+
+    def _delete(self):
+        self._expect('FROM')
+        table_name = self._name()
+        schema_names = [column['name'] for column in self._schema(table_name)]
+        return {'type': 'DELETE', 'table_name': table_name, 'where_clause': self._where(schema_names)}
+
+    # ---------- 条件 ----------
+
+    def _where(self, schema_names):
+        if not self._peek('WHERE'):
+            return None
+        self.pos += 1
+        self.schema_names = schema_names
+        return self._or()
+
+    def _or(self):
+        node = self._and()
+        while self._peek('OR'):
+            self.pos += 1
+            node = {'type': 'LOGICAL', 'operator': 'OR', 'left': node, 'right': self._and()}
+        return node
+
+    def _and(self):
+        node = self._comparison()
+        while self._peek('AND'):
+            self.pos += 1
+            node = {'type': 'LOGICAL', 'operator': 'AND', 'left': node, 'right': self._comparison()}
+        return node
+
+    def _comparison(self):
+        left = self._additive()
+        kind, operator = self._next()
+        if operator not in ('=', '!=', '<>', '<', '<=', '>', '>='):
+            raise ValueError(f"语法错误: 需要比较运算符，实际 {operator}")
+        return {'type': 'COMPARISON', 'operator': operator, 'left': left, 'right': self._additive()}
+
+    def _additive(self):
+        node = self._multiplicative()
+        while self._peek('+') or self._peek('-'):
+            operator = self._next()[1]
+            node = {'type': 'BINARY_OP', 'operator': operator, 'left': node, 'right': self._multiplicative()}
+        return node
+
+    def _multiplicative(self):
+        node = self._factor()
+        while self._peek('*') or self._peek('/'):
+            operator = self._next()[1]
+            node = {'type': 'BINARY_OP', 'operator': operator, 'left': node, 'right': self._factor()}
+        return node
+
+    def _factor(self):
+        kind, value = self._next()
+        if kind == 'OP' and value == '(':
+            node = self._additive()
+            self._expect(')')
+            return node
+        if kind == 'OP' and value == '-':
+            return {'type': 'NUMBER', 'value': -self._next()[1]}
+        if kind == 'NUMBER':
+            return {'type': 'NUMBER', 'value': value}
+        if kind == 'STRING':
+            return {'type': 'STRING', 'value': value}
+        if kind == 'WORD':
+            if value not in self.schema_names:
+                raise ValueError(f"语义错误: 列 '{value}' 不存在")
+            return {'type': 'COLUMN', 'name': value}
+        raise ValueError(f"语法错误: 意外的 {value}")
+
+
+# ==================== 执行引擎桩 ====================
+
+class StubStorage:
+    """存储层桩，统计页面读取次数"""
+
+    def __init__(self):
+        self.page_reads = 0
+
+    def get_cache_statistics(self):
+        return {'page_reads': self.page_reads}
+
+
+def _evaluate(node, row):
+    """计算条件或表达式的值"""
+    node_type = node['type']
+    if node_type == 'COLUMN':
+        return row.get(node['name'])
+    if node_type in ('NUMBER', 'STRING'):
+        return node['value']
+    left = _evaluate(node['left'], row)
+    right = _evaluate(node['right'], row)
+    operator = node['operator']
+    if node_type == 'LOGICAL':
+        return (left and right) if operator == 'AND' else (left or right)
+    if left is None or right is None:
+        return None
+    if node_type == 'BINARY_OP':
+        if operator == '/':
+            return left / right
+        return {'+': left + right, '-': left - right, '*': left * right}[operator]
+    return {
+        '=': left == right, '!=': left != right, '<>': left != right,
+        '<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right
+    }[operator]
+
+
+class StubEngine:
+    """内存执行引擎桩"""
+
+    def __init__(self, data_dir):
+        self.catalog = {}
+        self.tables = {}
+        self.storage = StubStorage()
+        self.scans = 0
+
+    def get_catalog(self):
+        return self.catalog
+
+    def _scan(self, plan):
+        self.scans += 1
+        rows = self.tables[plan['table_name']]
+        self.storage.page_reads += 1
+        where_clause = plan.get('where_clause')
+        return [row for row in rows if where_clause is None or _evaluate(where_clause, row)]
+
+    def execute_plan(self, plan):
+        plan_type = plan['type']
+        table_name = plan['table_name']
+        if plan_type == 'CREATE_TABLE':
+            self.catalog[table_name] = {'schema': {'columns': plan['columns']}}
+            self.tables[table_name] = []
+            return {'success': True, 'message': f"表 '{table_name}' 创建成功"}
+        if plan_type == 'DROP_TABLE':
+            del self.catalog[table_name]
+            del self.tables[table_name]
+            return {'success': True, 'message': f"表 '{table_name}' 删除成功"}
+        if plan_type == 'INSERT':
+            for values in plan['values']:
+                self.tables[table_name].append(dict(zip(plan['columns'], values)))
+            return {'success': True, 'message': "插入成功", 'affected_rows': len(plan['values'])}
+        if plan_type == 'SELECT':
+            columns = plan['columns']
+            if columns == ['*']:
+                columns = [column['name'] for column in self.catalog[table_name]['schema']['columns']]
+            data = [{name: row.get(name) for name in columns} for row in self._scan(plan)]
+            return {'success': True, 'data': data, 'columns': columns}
+        if plan_type == 'UPDATE':
+            rows = self._scan(plan)
+            for row in rows:
+                row.update(plan['set_clause'])
+            return {'success': True, 'message': f"成功更新 {len(rows)} 条记录", 'affected_rows': len(rows)}
+        if plan_type == 'DELETE':
+            rows = self._scan(plan)
+            self.tables[table_name] = [row for row in self.tables[table_name] if row not in rows]
+            return {'success': True, 'message': f"成功删除 {len(rows)} 条记录", 'affected_rows': len(rows)}
+        return {'success': False, 'error': f"不支持的计划类型: {plan_type}"}
+
+
+# ==================== 测试环境 ====================
+
+def _load_main_v3():
+    """用桩模块替换存储和权限模块后导入main_v3，导入完成后恢复sys.modules"""
+    stubs = {
+        'storage': types.ModuleType('storage'),
+        'storage.storage_adapter': types.ModuleType('storage.storage_adapter'),
+        'auth': types.ModuleType('auth'),
+        'auth.auth_manager': types.ModuleType('auth.auth_manager'),
+        'auth.permission_manager': types.ModuleType('auth.permission_manager'),
+    }
+    stubs['storage.storage_adapter'].StorageAdapter = StubStorageAdapter
+    stubs['auth.auth_manager'].AuthManager = StubAuthManager
+    stubs['auth.permission_manager'].PermissionManager = StubPermissionManager
+
+    saved = {name: sys.modules.get(name) for name in list(stubs) + ['main_v3']}
+    sys.modules.update(stubs)
+    sys.modules.pop('main_v3', None)
+    try:
+        module = importlib.import_module('main_v3')
+    finally:
+        for name, original in saved.items():
+            if original is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = original
+
+    module._load_compiler_class = lambda: StubCompiler
+    module._load_engine_class = lambda: StubEngine
+    return module
+
+
+main_v3 = _load_main_v3()
+
+
+class _Database:
+    """在临时目录中创建已登录的数据库系统"""
+
+    def __enter__(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.db = main_v3.DatabaseSystemV3(os.path.join(self.data_dir, 'data'))
+        self.db.work_dir = self.data_dir
+        assert self.db.login('admin', 'admin123')
+        return self.db
+
+    def __exit__(self, *exc_info):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+def _run(db, sql):
+    """执行SQL并断言成功"""
+    result = db.execute_sql(sql)
+    assert result['success'], (sql, result)
+    return result
+
+
+# ==================== 执行计划缓存 ====================
+
+def test_plan_cache_hits():
+    """测试同形状语句只编译一次，结果与逐条编译一致"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(10), age INT);")
+        _run(db, "INSERT INTO tst1 VALUES (1, 'Alice', 25);")
+        _run(db, "INSERT INTO tst1 VALUES (2, 'Bob', 30);")
+        _run(db, "INSERT INTO tst1 VALUES (3, 'Charlie', 18);")
+        assert len(db.compiler.compiled) == 2
+
+        assert _run(db, "SELECT name FROM tst1 WHERE age > 20;")['data'] == [{'name': 'Alice'}, {'name': 'Bob'}]
+        assert _run(db, "SELECT name FROM tst1 WHERE age > 26;")['data'] == [{'name': 'Bob'}]
+        assert len(db.compiler.compiled) == 3
+
+        stats = db.plan_cache.get_statistics()
+        assert (stats['hits'], stats['misses'], stats['uncacheable']) == (3, 2, 0)
+
+
+def test_uncacheable_statistics():
+    """测试不可缓存的形状每次完整编译且不计为命中"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, age INT);")
+        compiled = len(db.compiler.compiled)
+        stats_before = db.plan_cache.get_statistics()
+
+        # 负数字面量被编译器折叠，找不到占位值，该形状不可缓存
+        for _ in range(4):
+            _run(db, "SELECT * FROM tst1 WHERE age > -5;")
+        assert len(db.compiler.compiled) - compiled == 5
+
+        stats = db.plan_cache.get_statistics()
+        assert stats['hits'] == stats_before['hits']
+        assert stats['misses'] - stats_before['misses'] == 4
+        assert stats['uncacheable'] == 3
+
+
+def test_bind_time_check():
+    """测试缓存命中时超长字符串回退到完整编译，由语义分析报错"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(5));")
+        _run(db, "INSERT INTO tst1 VALUES (1, 'Alice');")
+
+        result = db.execute_sql("INSERT INTO tst1 VALUES (2, 'Alice Smith');")
+        assert not result['success']
+        assert '超过长度' in result['error'], result
+
+        result = db.execute_sql("UPDATE tst1 SET name = 'Alice Smith' WHERE id = 1;")
+        assert not result['success'] and '超过长度' in result['error'], result
+
+        handle = db.prepare("INSERT INTO tst1 (id, name) VALUES (?, ?);")
+        assert db.execute_prepared(handle, (3, 'Bob'))['success']
+        assert not db.execute_prepared(handle, (4, 'Robert'))['success']
+
+        assert [row['id'] for row in _run(db, "SELECT * FROM tst1;")['data']] == [1, 3]
+
+
+def test_ddl_invalidation():
+    """测试DDL后同步编译器目录并使引用该表的缓存计划失效"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(10));")
+        _run(db, "INSERT INTO tst1 VALUES (1, 'Alice');")
+        _run(db, "SELECT * FROM tst1 WHERE id = 1;")
+        assert 'tst1' in db.compiler.semantic_analyzer.catalog
+
+        _run(db, "DROP TABLE tst1;")
+        assert 'tst1' not in db.compiler.semantic_analyzer.catalog
+        result = db.execute_sql("SELECT * FROM tst1 WHERE id = 1;")
+        assert not result['success'] and '不存在' in result['error']
+
+        _run(db, "CREATE TABLE tst1 (id INT, age INT);")
+        _run(db, "INSERT INTO tst1 VALUES (1, 40);")
+        result = _run(db, "SELECT * FROM tst1 WHERE id = 1;")
+        assert result['columns'] == ['id', 'age']
+        assert result['data'] == [{'id': 1, 'age': 40}]
+        assert db.plan_cache.get_statistics()['invalidations'] > 0
+
+
+# ==================== 预编译语句 ====================
+
+def test_prepared_statements():
+    """测试预编译语句与同形状的普通语句共享缓存计划"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(10), age INT);")
+        handle = db.prepare("INSERT INTO tst1 VALUES (?, ?, 18);")
+        assert db.execute_prepared(handle, (1, 'Alice'))['success']
+        assert db.execute_prepared(handle, (2, 'Bob'))['success']
+        _run(db, "INSERT INTO tst1 VALUES (3, 'Carol', 18);")
+        assert len(db.compiler.compiled) == 2
+
+        result = db.execute_prepared(handle, (4,))
+        assert not result['success'] and '参数错误' in result['error']
+        assert db.close_prepared(handle)
+        assert not db.execute_prepared(handle, (5, 'Dave'))['success']
+
+        data = _run(db, "SELECT * FROM tst1;")['data']
+        assert [(row['id'], row['name'], row['age']) for row in data] == \
+            [(1, 'Alice', 18), (2, 'Bob', 18), (3, 'Carol', 18)]
+
+
+def test_prepared_fallback_rendering():
+    """测试回退到完整编译时浮点参数渲染为合法的SQL字面量"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, score FLOAT, name VARCHAR(10));")
+        handle = db.prepare("INSERT INTO tst1 VALUES (?, ?, ?);")
+        # 超出32位范围的整数不走缓存计划，用渲染出的SQL完整编译
+        result = db.execute_prepared(handle, (2 ** 40, 1e-05, 'a'))
+        assert result['success'], result
+        assert db.execute_prepared(handle, (2 ** 40, 1e+20, 'b'))['success']
+
+        result = db.execute_prepared(handle, (1, float('nan'), 'c'))
+        assert not result['success'] and '参数错误' in result['error'], result
+
+        data = _run(db, "SELECT * FROM tst1;")['data']
+        assert [(row['id'], row['score']) for row in data] == [(2 ** 40, 1e-05), (2 ** 40, 1e+20)]
+
+
+def test_prepared_permission_revoked():
+    """测试撤销权限后已打开的预编译语句立即被拒绝"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(10));")
+        handle = db.prepare("INSERT INTO tst1 VALUES (?, ?);")
+        assert db.execute_prepared(handle, (1, 'Alice'))['success']
+
+        db.permission_manager.denied.add(('tst1', 'INSERT'))
+        result = db.execute_prepared(handle, (2, 'Bob'))
+        assert not result['success'] and '权限不足' in result['error'], result
+        result = db.execute_sql("INSERT INTO tst1 VALUES (3, 'Carol');")
+        assert not result['success'] and '权限不足' in result['error'], result
+
+        db.permission_manager.denied.clear()
+        assert db.execute_prepared(handle, (4, 'Dave'))['success']
+        assert [row['id'] for row in _run(db, "SELECT * FROM tst1;")['data']] == [1, 4]
+
+
+def test_executemany():
+    """测试executemany在一次调用内只检查一次权限，每次调用重新检查"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(10));")
+        calls = db.permission_manager.calls
+        calls.clear()
+
+        result = db.executemany("INSERT INTO tst1 VALUES (?, ?);", [(1, 'Alice'), (2, 'Bob'), (3, 'Carol')])
+        assert result['success'] and result['affected_rows'] == 3, result
+        assert calls == [(1, 'tst1', 'INSERT')]
+
+        db.permission_manager.denied.add(('tst1', 'INSERT'))
+        result = db.executemany("INSERT INTO tst1 VALUES (?, ?);", [(4, 'Dave')])
+        assert not result['success'] and '权限不足' in result['error'], result
+        db.permission_manager.denied.clear()
+
+        result = db.executemany("INSERT INTO tst1 VALUES (?, ?);", [(5, 'Eve'), (6, 'Frank Abraham')])
+        assert not result['success'] and result['error'].startswith('第 2 组参数执行失败'), result
+        assert result['affected_rows'] == 1
+
+        assert [row['id'] for row in _run(db, "SELECT * FROM tst1;")['data']] == [1, 2, 3, 5]
+
+
+# ==================== COPY ====================
+
+def test_copy_round_trip():
+    """测试COPY FROM导入CSV/JSONL并用COPY TO导出"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(10), age INT);")
+        csv_path = os.path.join(db.work_dir, 'in.csv')
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            f.write("id,name,age\n1,Alice,25\n2,\"O'Brien\",30\n3,Carol,\n")
+
+        calls = db.permission_manager.calls
+        calls.clear()
+        compiled = len(db.compiler.compiled)
+        result = _run(db, f"COPY tst1 FROM '{csv_path}' (FORMAT csv);")
+        assert result['affected_rows'] == 3
+        assert calls == [(1, 'tst1', 'INSERT')]
+        # 含NULL的行类型签名不同，另编译一次
+        assert len(db.compiler.compiled) - compiled == 2
+
+        jsonl_path = os.path.join(db.work_dir, 'in.jsonl')
+        with open(jsonl_path, 'w', encoding='utf-8') as f:
+            f.write('{"id": 4, "name": "Dave"}\n\n{"id": 5, "name": "Eve", "age": 41}\n')
+        assert _run(db, f"COPY tst1 FROM '{jsonl_path}';")['affected_rows'] == 2
+
+        out_path = os.path.join(db.work_dir, 'out.jsonl')
+        _run(db, f"COPY tst1 TO '{out_path}' FORMAT jsonl;")
+        with open(out_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 5
+        assert lines[1] == '{"id": 2, "name": "O\'Brien", "age": 30}'
+        assert lines[3] == '{"id": 4, "name": "Dave", "age": null}'
+
+        # 导出的CSV可以重新导入，空字符串和NULL保持不同
+        _run(db, "INSERT INTO tst1 VALUES (6, '', 50);")
+        out_csv = os.path.join(db.work_dir, 'out.csv')
+        _run(db, f"COPY tst1 TO '{out_csv}';")
+        _run(db, "CREATE TABLE tst2 (id INT, name VARCHAR(10), age INT);")
+        assert _run(db, f"COPY tst2 FROM '{out_csv}';")['affected_rows'] == 6
+        rows = _run(db, "SELECT * FROM tst2;")['data']
+        assert rows == _run(db, "SELECT * FROM tst1;")['data']
+        assert rows[5]['name'] == '' and rows[3]['age'] is None
+
+
+def test_copy_errors():
+    """测试COPY遇到错误时报告行号并停止，每次COPY重新检查权限"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(5));")
+        path = os.path.join(db.work_dir, 'in.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write("id,name\n1,Alice\n2,Robert\n3,Carol\n")
+
+        result = db.execute_sql(f"COPY tst1 FROM '{path}';")
+        assert not result['success'] and '第 3 行' in result['error'], result
+        assert result['affected_rows'] == 1
+
+        result = db.execute_sql(f"COPY missing FROM '{path}';")
+        assert not result['success'] and '不存在' in result['error']
+
+        db.permission_manager.denied.add(('tst1', 'INSERT'))
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write("id,name\n4,Dave\n")
+        result = db.execute_sql(f"COPY tst1 FROM '{path}';")
+        assert not result['success'] and '权限不足' in result['error'], result
+        assert [row['id'] for row in _run(db, "SELECT * FROM tst1;")['data']] == [1]
+
+        # 没有权限时在读取文件之前就拒绝：只有表头的文件、不存在的文件和不存在的表都报告权限不足
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write("id,name\n")
+        db.permission_manager.denied.add(('missing', 'INSERT'))
+        for sql in (f"COPY tst1 FROM '{path}';", f"COPY tst1 FROM '{path}.none';", f"COPY missing FROM '{path}';"):
+            result = db.execute_sql(sql)
+            assert not result['success'] and '权限不足' in result['error'], result
+
+
+# ==================== EXPLAIN ====================
+
+def test_explain():
+    """测试EXPLAIN只编译不执行，EXPLAIN ANALYZE附带实际行数和页面I/O"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(10), age INT);")
+        db.executemany("INSERT INTO tst1 VALUES (?, ?, ?);", [(1, 'Alice', 25), (2, 'Bob', 30), (3, 'Carol', 18)])
+
+        scans = db.engine.scans
+        result = _run(db, "EXPLAIN SELECT name FROM tst1 WHERE age > 20;")
+        assert result['explain'].splitlines() == [
+            "Project (columns: name)",
+            "  -> Filter (condition: (age > 20))",
+            "    -> SeqScan (table: tst1)",
+        ]
+        assert db.engine.scans == scans
+
+        result = _run(db, "EXPLAIN ANALYZE FORMAT JSON DELETE FROM tst1 WHERE age < 20;")
+        assert result['plan']['operator'] == 'Delete'
+        assert result['plan']['actual']['rows_out'] == 1
+        assert result['plan']['actual']['buffer'] == {'page_reads': 1}
+        assert '"rows_out": 1' in result['explain']
+        assert len(_run(db, "SELECT * FROM tst1;")['data']) == 2
+
+        db.permission_manager.denied.add(('tst1', 'SELECT'))
+        result = db.execute_sql("EXPLAIN SELECT * FROM tst1;")
+        assert not result['success'] and '权限不足' in result['error'], result
+
+
+def test_explain_ddl():
+    """测试EXPLAIN DDL不执行，编译器目录保持与执行引擎一致"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT);")
+        result = _run(db, "EXPLAIN CREATE TABLE tst2 (id INT, name VARCHAR(10));")
+        assert result['plan']['operator'] == 'CreateTable', result['plan']
+        assert 'tst2' not in db.engine.get_catalog()
+        result = db.execute_sql("SELECT * FROM tst2;")
+        assert not result['success'] and '不存在' in result['error'], result
+        _run(db, "CREATE TABLE tst2 (id INT, name VARCHAR(10));")
+
+        _run(db, "EXPLAIN DROP TABLE tst1;")
+        assert 'tst1' in db.compiler.semantic_analyzer.catalog
+        assert _run(db, "SELECT * FROM tst1;")['data'] == []
+        _run(db, "DROP TABLE tst1;")
+        assert 'tst1' not in db.engine.get_catalog()
+
+
+# ==================== WHERE条件化简 ====================
+
+def test_condition_simplification():
+    """测试常量折叠、恒真条件去除和恒假条件不扫描直接返回空结果"""
+    with _Database() as db:
+        _run(db, "CREATE TABLE tst1 (id INT, name VARCHAR(10), age INT);")
+        db.executemany("INSERT INTO tst1 VALUES (?, ?, ?);", [(1, 'Alice', 25), (2, 'Bob', 30), (3, 'Carol', 18)])
+
+        result = _run(db, "SELECT name FROM tst1 WHERE 1 = 1 AND age > 10 + 10;")
+        assert result['data'] == [{'name': 'Alice'}, {'name': 'Bob'}]
+        result = _run(db, "EXPLAIN SELECT name FROM tst1 WHERE 1 = 1 AND age > 10 + 10 AND age > 5;")
+        assert "Filter (condition: (age > 20))" in result['explain'], result['explain']
+
+        # 同形状不同字面量共享缓存计划，每次执行按真实值化简
+        scans = db.engine.scans
+        result = _run(db, "SELECT name FROM tst1 WHERE 1 = 2 AND age > 10 + 10;")
+        assert result['data'] == [] and result['columns'] == ['name']
+        result = _run(db, "SELECT * FROM tst1 WHERE age > 30 AND age < 10;")
+        assert result['data'] == [] and result['columns'] == ['id', 'name', 'age']
+        result = _run(db, "DELETE FROM tst1 WHERE id = 1 AND id = 2;")
+        assert result['affected_rows'] == 0
+        assert db.engine.scans == scans
+
+        result = _run(db, "EXPLAIN SELECT * FROM tst1 WHERE age > 30 AND age < 10;")
+        assert result['explain'] == "Result (one_time_filter: false, table: tst1)"
+
+        assert len(_run(db, "SELECT * FROM tst1 WHERE 2 > 1;")['data']) == 3
+        result = _run(db, "UPDATE tst1 SET age = 40 WHERE age >= 18 AND age >= 25 AND age < 30;")
+        assert result['affected_rows'] == 1
+        assert _run(db, "SELECT name FROM tst1 WHERE age = 40;")['data'] == [{'name': 'Alice'}]
+
+        # 恒假条件也要先检查权限
+        db.permission_manager.denied.add(('tst1', 'SELECT'))
+        result = db.execute_sql("SELECT * FROM tst1 WHERE 1 = 2;")
+        assert not result['success'] and '权限不足' in result['error']
+
+
+# ==================== 脚本执行 ====================
+
+def _run_main(script):
+    """在临时目录中以脚本文件运行main()，返回退出状态"""
+    work_dir = tempfile.mkdtemp()
+    saved_cwd, saved_argv = os.getcwd(), sys.argv
+    try:
+        os.chdir(work_dir)
+        with open('script.sql', 'w', encoding='utf-8') as f:
+            f.write(script)
+        sys.argv = ['main_v3.py', 'script.sql']
+        try:
+            main_v3.main()
+        except SystemExit as e:
+            return e.code
+        return 0
+    finally:
+        os.chdir(saved_cwd)
+        sys.argv = saved_argv
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_script_exit_status():
+    """测试脚本中有语句失败时main()以非零状态退出"""
+    script = "CREATE TABLE tst1 (id INT);\nINSERT INTO tst1 VALUES (1);\nSELECT * FROM tst1;\n"
+    assert _run_main(script) == 0
+    assert _run_main(script + "SELECT * FROM missing;\n") == 1
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("DatabaseSystemV3 端到端测试")
+    print("=" * 60)
+
+    tests = [test_plan_cache_hits, test_uncacheable_statistics, test_bind_time_check, test_ddl_invalidation,
+             test_prepared_statements, test_prepared_fallback_rendering, test_prepared_permission_revoked,
+             test_executemany, test_copy_round_trip, test_copy_errors, test_explain, test_explain_ddl,
+             test_condition_simplification, test_script_exit_status]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+    print(f"\n测试结果: {passed}/{len(tests)} 通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+执行计划展示测试
+"""
+
+import json
+import os
+import sys
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from explain import parse_explain, build_operator_tree, format_explain, io_statistics_delta
+
+SELECT_PLAN = {
+    'type': 'SELECT',
+    'table_name': 'tst1',
+    'columns': ['id', 'name'],
+    'where_clause': {'type': 'comparison', 'operator': '>', 'left': 'age', 'right': 20}
+}
+
+
+def test_parse_explain():
+    """测试EXPLAIN前缀解析"""
+    assert parse_explain("SELECT * FROM tst1;") is None
+    explain = parse_explain("explain analyze format json SELECT * FROM tst1;")
+    assert explain == {'analyze': True, 'format': 'JSON', 'sql': "SELECT * FROM tst1;"}
+    assert parse_explain("EXPLAIN DELETE FROM tst1;")['analyze'] is False
+
+
+def test_operator_tree():
+    """测试SELECT计划的算子树和文本输出"""
+    tree = build_operator_tree(SELECT_PLAN)
+    assert tree['operator'] == 'Project'
+    assert tree['children'][0]['operator'] == 'Filter'
+    assert tree['children'][0]['children'][0]['operator'] == 'SeqScan'
+
+    text = format_explain(tree, 'TEXT')
+    assert text.splitlines() == [
+        "Project (columns: id, name)",
+        "  -> Filter (condition: (age > 20))",
+        "    -> SeqScan (table: tst1)",
+    ]
+
+    tree['actual'] = {'time_ms': 1.5, 'rows_out': 2, 'buffer': {'hit_count': 3}}
+    text = format_explain(tree, 'TEXT')
+    assert "输出行数=2" in text.splitlines()[0]
+    assert text.splitlines()[-1] == "缓冲区/页面I/O: hit_count +3"
+    assert json.loads(format_explain(tree, 'JSON'))['actual']['rows_out'] == 2
+
+
+def test_aggregate_and_sort():
+    """测试分组、聚合、排序和LIMIT算子"""
+    plan = {
+        'type': 'SELECT',
+        'table_name': 'students',
+        'columns': ['class', {'type': 'FUNCTION', 'name': 'AVG', 'args': ['score'], 'alias': 'avg_score'}],
+        'group_by': ['class'],
+        'having': {'type': 'COMPARISON', 'operator': '>',
+                   'left': {'type': 'FUNCTION', 'name': 'AVG', 'args': ['score']},
+                   'right': {'type': 'NUMBER', 'value': 85}},
+        'order_by': [{'column': 'avg_score', 'direction': 'desc'}],
+        'limit': 10
+    }
+    text = format_explain(build_operator_tree(plan), 'TEXT')
+    assert text.splitlines() == [
+        "Limit (count: 10)",
+        "  -> Sort (sort_key: avg_score DESC)",
+        "    -> Project (columns: class, AVG(score) AS avg_score)",
+        "      -> Aggregate (group_key: class, aggregates: AVG(score) AS avg_score, filter: (AVG(score) > 85))",
+        "        -> SeqScan (table: students)",
+    ]
+
+    # 没有GROUP BY的聚合
+    tree = build_operator_tree({'type': 'SELECT', 'table_name': 't', 'columns': ['COUNT(*)']})
+    assert tree['children'][0]['operator'] == 'Aggregate'
+    assert tree['children'][0]['details'] == {'aggregates': 'COUNT(*)'}
+
+
+def test_unmodeled_keys():
+    """测试算子树没有体现的计划键放在根节点详情中"""
+    plan = dict(SELECT_PLAN, distinct=True, joins=[{'table': 'tst2'}], hint=None)
+    tree = build_operator_tree(plan)
+    assert tree['details'] == {'columns': 'id, name', 'distinct': 'True', 'joins': "{'table': 'tst2'}"}
+
+    tree = build_operator_tree({'type': 'UPDATE', 'table_name': 'tst1', 'set_clause': {'name': "O'Brien", 'age': 3}})
+    assert tree['details']['set'] == "name = 'O''Brien', age = 3"
+
+
+def test_io_statistics_delta():
+    """测试缓存统计变化量"""
+    before = {'hit_count': 1, 'miss_count': 4, 'policy': 'LRU'}
+    after = {'hit_count': 5, 'miss_count': 4, 'policy': 'LRU'}
+    assert io_statistics_delta(before, after) == {'hit_count': 4}
+    assert io_statistics_delta(None, after) == {}
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("执行计划展示测试")
+    print("=" * 60)
+
+    tests = [test_parse_explain, test_operator_tree, test_aggregate_and_sort, test_unmodeled_keys,
+             test_io_statistics_delta]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+    print(f"\n测试结果: {passed}/{len(tests)} 通过")
+
+
+if __name__ == "__main__":
+    main()
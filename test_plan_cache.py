@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+执行计划缓存测试
+"""
+
+import os
+import sys
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from plan_cache import PlanCache, CachedPlan, parse_sql_template, render_literal, stored_value_columns
+
+
+def _versions(table_name=None):
+    """所有表的目录版本都为0"""
+    return 0
+
+
+def test_template_shape():
+    """测试字面量去除和规范化"""
+    a = parse_sql_template("SELECT * FROM tst1 WHERE age > 20;")
+    b = parse_sql_template("SELECT  *\n FROM tst1 -- 注释\n WHERE age > 35;")
+    assert a.shape == b.shape
+    assert a.cache_key(a.bind_values()) == b.cache_key(b.bind_values())
+    assert a.bind_values() == [20]
+
+    c = parse_sql_template("SELECT * FROM tst1 WHERE age > 'x';")
+    assert a.cache_key(a.bind_values()) != c.cache_key(c.bind_values())
+
+    d = parse_sql_template("INSERT INTO tst1 VALUES (1, 'O''Brien', 2.5);")
+    assert d.bind_values() == [1, "O'Brien", 2.5]
+    assert d.render(d.bind_values()) == "INSERT INTO tst1 VALUES (1, 'O''Brien', 2.5);"
+
+    # 多语句和未闭合字符串不走缓存
+    assert parse_sql_template("DELETE FROM a; DELETE FROM b;") is None
+    assert parse_sql_template("SELECT * FROM a WHERE name = 'abc") is None
+    assert not parse_sql_template("CREATE TABLE t (name VARCHAR(50));").cacheable
+
+
+def test_bind_plan():
+    """测试占位值定位和字面量绑定"""
+    template = parse_sql_template("SELECT * FROM tst1 WHERE age > 20 AND name = 'Bob';")
+    values = template.bind_values()
+    sql, sentinels = template.render_sentinels(values)
+    assert "20" not in sql and "'Bob'" not in sql
+
+    # 模拟编译器用占位值生成的计划，其中整数被转换成了浮点数
+    plan = {
+        'type': 'SELECT',
+        'table_name': 'tst1',
+        'where_clause': {
+            'type': 'logical', 'operator': 'AND',
+            'left': {'type': 'comparison', 'operator': '>', 'left': 'age', 'right': float(sentinels[0])},
+            'right': {'type': 'comparison', 'operator': '=', 'left': 'name', 'right': sentinels[1]}
+        }
+    }
+    entry = CachedPlan.build(plan, sentinels, _versions)
+    assert entry.plan is not None
+
+    bound = entry.bind([30, 'Alice'])
+    assert bound['where_clause']['left']['right'] == 30.0
+    assert isinstance(bound['where_clause']['left']['right'], float)
+    assert bound['where_clause']['right']['right'] == 'Alice'
+    # 缓存的模板不被修改
+    assert plan['where_clause']['right']['right'] == sentinels[1]
+
+    # 找不到占位值时该形状不可缓存
+    entry = CachedPlan.build({'type': 'SELECT', 'table_name': 'tst1'}, sentinels, _versions)
+    assert entry.plan is None
+
+
+def test_bind_checks():
+    """测试写入列的槽位定位和绑定前的长度、范围检查"""
+    template = parse_sql_template("INSERT INTO tst1 VALUES (1, 'Alice', 25);")
+    assert stored_value_columns(template) == ({0: 0, 1: 1, 2: 2}, set())
+
+    template = parse_sql_template("INSERT INTO tst1 (name, id) VALUES ('a', 1), ('b', -2);")
+    assert stored_value_columns(template) == ({0: 'name', 1: 'id', 2: 'name'}, {3})
+
+    template = parse_sql_template("UPDATE tst1 SET name = 'x', age = age + 1 WHERE name = 'y';")
+    assert stored_value_columns(template) == ({0: 'name'}, {1})
+
+    template = parse_sql_template("SELECT * FROM tst1 WHERE name = 'x';")
+    assert stored_value_columns(template) == ({}, set())
+
+    entry = CachedPlan.build({'type': 'INSERT', 'table_name': 'tst1'}, [], _versions)
+    entry.length_limits[1] = 5
+    assert entry.values_fit([1, 'Alice', 25])
+    assert not entry.values_fit([1, 'Alice!', 25])
+    assert not entry.values_fit([2 ** 40, 'Bob', 25])
+
+
+def test_lru_and_invalidation():
+    """测试LRU淘汰和目录版本失效"""
+    cache = PlanCache(capacity=2)
+    versions = {'t1': 0}
+
+    def catalog_version(table_name=None):
+        return versions.get(table_name, 0)
+
+    plan = {'type': 'SELECT', 'table_name': 't1'}
+    cache.store('a', CachedPlan.build(plan, [], catalog_version))
+    cache.store('b', CachedPlan.build(plan, [], catalog_version))
+    assert cache.lookup('a', catalog_version) is not None
+    cache.store('c', CachedPlan.build(plan, [], catalog_version))
+    assert cache.lookup('b', catalog_version) is None
+
+    versions['t1'] = 1
+    assert cache.lookup('a', catalog_version) is None
+
+    stats = cache.get_statistics()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert stats['evictions'] == 1
+    assert stats['invalidations'] == 1
+    assert stats['size'] == 1
+
+
+def test_uncacheable_statistics():
+    """测试不可缓存标记的查找计为未命中"""
+    cache = PlanCache()
+    cache.store('bad', CachedPlan.build(None, [], _versions))
+    for _ in range(3):
+        entry = cache.lookup('bad', _versions)
+        assert entry is not None and entry.plan is None
+
+    stats = cache.get_statistics()
+    assert stats['hits'] == 0
+    assert stats['misses'] == 3
+    assert stats['uncacheable'] == 3
+    assert stats['hit_rate'] == 0.0
+
+
+def test_prepared_template():
+    """测试预编译语句的参数绑定"""
+    template = parse_sql_template("INSERT INTO tst1 VALUES (?, ?, 18);")
+    assert template.param_count == 2
+    assert template.bind_values((1, 'Alice')) == [1, 'Alice', 18]
+    assert template.render([1, "it's", 18]) == "INSERT INTO tst1 VALUES (1, 'it''s', 18);"
+
+    # 与同形状的普通语句共享缓存键
+    literal = parse_sql_template("INSERT INTO tst1 VALUES (2, 'Bob', 30);")
+    assert template.cache_key([1, 'Alice', 18]) == literal.cache_key(literal.bind_values())
+
+    # 浮点数以定点小数渲染，非有限值报错
+    assert render_literal(1e-05) == '0.00001'
+    assert render_literal(1e+20) == '100000000000000000000.0'
+    assert render_literal(-2.5) == '-2.5'
+    floats = parse_sql_template("INSERT INTO tst1 VALUES (?, ?, ?);")
+    assert floats.render([2 ** 40, 1e-05, 'a']) == "INSERT INTO tst1 VALUES (1099511627776, 0.00001, 'a');"
+    for value in (float('inf'), float('nan')):
+        try:
+            render_literal(value)
+            assert False, "非有限浮点数应报错"
+        except ValueError:
+            pass
+
+    try:
+        template.bind_values((1,))
+        assert False, "参数个数不匹配时应报错"
+    except ValueError:
+        pass
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("执行计划缓存测试")
+    print("=" * 60)
+
+    tests = [test_template_shape, test_bind_plan, test_bind_checks, test_lru_and_invalidation, test_uncacheable_statistics,
+             test_prepared_template]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+    print(f"\n测试结果: {passed}/{len(tests)} 通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+SQL脚本流式切分测试
+"""
+
+import io
+import os
+import sys
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from script_runner import iter_sql_statements
+
+SCRIPT = """-- 注释里的分号; 和 'quote
+CREATE TABLE t (id INT, name VARCHAR(50));
+INSERT INTO t VALUES (1, 'a;b');   /* 块注释;
+跨行 */ INSERT INTO t VALUES (2, 'it''s; ok');
+SELECT * FROM t WHERE id = 10-2;
+SELECT * FROM t /* 末尾 */ WHERE name = 'x
+y'
+"""
+
+EXPECTED = [
+    (2, "CREATE TABLE t (id INT, name VARCHAR(50));"),
+    (3, "INSERT INTO t VALUES (1, 'a;b');"),
+    (4, "INSERT INTO t VALUES (2, 'it''s; ok');"),
+    (5, "SELECT * FROM t WHERE id = 10-2;"),
+    (6, "SELECT * FROM t   WHERE name = 'x\ny'"),
+]
+
+
+def test_split_statements():
+    """测试字符串和注释中的分号不切分语句"""
+    statements = list(iter_sql_statements(io.StringIO(SCRIPT)))
+    assert statements == EXPECTED, statements
+
+
+def test_chunk_boundaries():
+    """测试任意块大小下结果一致"""
+    for chunk_size in (1, 2, 3, 7, 64):
+        statements = list(iter_sql_statements(io.StringIO(SCRIPT), chunk_size=chunk_size))
+        assert statements == EXPECTED, (chunk_size, statements)
+
+
+def test_repo_script():
+    """测试切分仓库中的示例脚本"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_operations.sql')
+    with open(path, 'r', encoding='utf-8') as f:
+        statements = list(iter_sql_statements(f))
+    assert len(statements) == 13
+    assert statements[0] == (5, "CREATE TABLE users (id INT, name VARCHAR(50), age INT, email VARCHAR(100));")
+    assert all(not sql.startswith('--') and 'DROP' not in sql for _, sql in statements)
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("SQL脚本流式切分测试")
+    print("=" * 60)
+
+    tests = [test_split_statements, test_chunk_boundaries, test_repo_script]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+    print(f"\n测试结果: {passed}/{len(tests)} 通过")
+
+
+if __name__ == "__main__":
+    main()
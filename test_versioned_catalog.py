@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+版本化系统目录测试
+"""
+
+import os
+import sys
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from plan_cache import PlanCache, CachedPlan
+from versioned_catalog import VersionedCatalog
+
+
+def test_apply_ddl():
+    """测试DDL只同步被修改的表并递增版本"""
+    catalog = VersionedCatalog()
+    engine_catalog = {'t1': {'schema': {'columns': ['id']}}}
+    compiler_catalog = {}
+
+    catalog.sync_all(engine_catalog, compiler_catalog)
+    assert compiler_catalog == {'t1': {'columns': ['id']}}
+    assert catalog.version('t1') == 0
+
+    notified = []
+    catalog.subscribe(notified.append)
+
+    engine_catalog['t2'] = {'schema': {'columns': ['name']}}
+    catalog.apply_ddl('t2', engine_catalog, compiler_catalog)
+    assert compiler_catalog['t2'] == {'columns': ['name']}
+    assert catalog.version('t2') == 1
+    assert catalog.version('t1') == 0
+    assert catalog.version() == 1
+
+    del engine_catalog['t1']
+    catalog.apply_ddl('t1', engine_catalog, compiler_catalog)
+    assert 't1' not in compiler_catalog
+    assert catalog.version('t1') == 1
+    assert notified == ['t2', 't1']
+
+
+def test_plan_cache_notification():
+    """测试表结构变化通知使执行计划缓存失效"""
+    catalog = VersionedCatalog()
+    cache = PlanCache()
+    catalog.subscribe(cache.invalidate_table)
+
+    cache.store('t1', CachedPlan.build({'type': 'SELECT', 'table_name': 't1'}, [], catalog.version))
+    cache.store('t2', CachedPlan.build({'type': 'SELECT', 'table_name': 't2'}, [], catalog.version))
+    cache.store('bad', CachedPlan.build(None, [], catalog.version))
+
+    catalog.apply_ddl('t1', {}, {})
+    assert set(cache.entries) == {'t2'}
+    assert cache.get_statistics()['invalidations'] == 2
+
+
+def main():
+    """主测试函数"""
+    print("=" * 60)
+    print("版本化系统目录测试")
+    print("=" * 60)
+
+    tests = [test_apply_ddl, test_plan_cache_notification]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+    print(f"\n测试结果: {passed}/{len(tests)} 通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+版本化系统目录
+编译器和执行引擎共享的目录版本信息：每张表有单调递增的版本号，
+DDL执行后只同步被修改的表并通知订阅者，DML不需要同步目录
+"""
+
+from typing import Dict, Any, Optional, List, Callable
+
+# 会改变表结构的执行计划类型
+DDL_PLAN_TYPES = ('CREATE_TABLE', 'DROP_TABLE')
+
+
+class VersionedCatalog:
+    """版本化系统目录"""
+
+    def __init__(self):
+        """初始化目录版本"""
+        self.epoch = 0
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+
+    def version(self, table_name: Optional[str] = None) -> int:
+        """获取表的目录版本，table_name为None时返回全局版本"""
+        if table_name is None:
+            return self.epoch
+        return self._versions.get(table_name, 0)
+
+    def subscribe(self, listener: Callable[[Optional[str]], None]):
+        """订阅表结构变化通知，参数为发生变化的表名（None表示全部）"""
+        self._listeners.append(listener)
+
+    def sync_all(self, engine_catalog: Dict[str, Any], compiler_catalog: Dict[str, Any]):
+        """把执行引擎目录中编译器尚不知道的表全部同步到编译器目录"""
+        for table_name, table_info in engine_catalog.items():
+            if table_name not in compiler_catalog:
+                compiler_catalog[table_name] = table_info['schema']
+
+    def apply_ddl(self, table_name: Optional[str], engine_catalog: Dict[str, Any],
+                  compiler_catalog: Dict[str, Any]):
+        """DDL执行后同步被修改的表，递增版本并通知订阅者"""
+        if table_name is None:
+            self.sync_all(engine_catalog, compiler_catalog)
+        else:
+            table_info = engine_catalog.get(table_name)
+            if table_info is None:
+                compiler_catalog.pop(table_name, None)
+            elif table_name not in compiler_catalog:
+                compiler_catalog[table_name] = table_info['schema']
+            self._versions[table_name] = self._versions.get(table_name, 0) + 1
+
+        self.epoch += 1
+        for listener in self._listeners:
+            listener(table_name)